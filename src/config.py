@@ -2,11 +2,17 @@
 Configuration loading and validation for insurance policy data.
 """
 import json
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import dataclass, field, fields
+from operator import itemgetter
+from typing import List, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
 
-@dataclass
+
+@dataclass(slots=True)
 class PolicyInfo:
     product_name: str
     product_name_en: str
@@ -21,9 +27,14 @@ class PolicyInfo:
     total_premium: float
     coverage_type: str
     plan_date: str
+    # Derived once at construction: insurer name as used in report file names
+    slug: str = field(init=False, repr=False)
 
+    def __post_init__(self):
+        self.slug = self.insurer.lower().replace(' ', '_')
 
-@dataclass
+
+@dataclass(slots=True)
 class YearlyRecord:
     year: int
     age: int
@@ -35,7 +46,7 @@ class YearlyRecord:
     total_death_benefit: float
 
 
-@dataclass
+@dataclass(slots=True)
 class WithdrawalRecord:
     year: int
     withdrawal_amount: float           # 0 for early years, actual amount when withdrawals start
@@ -45,7 +56,7 @@ class WithdrawalRecord:
     remaining_surrender_total: float       # (A)+(B)+(C) after withdrawal
 
 
-@dataclass
+@dataclass(slots=True)
 class BrandConfig:
     primary_color: str = "#C8102E"
     secondary_color: str = "#FFFFFF"
@@ -53,7 +64,7 @@ class BrandConfig:
     logo_text: str = "AIA"
 
 
-@dataclass
+@dataclass(slots=True)
 class DisplaySettings:
     highlight_years: List[int] = field(default_factory=lambda: [5, 10, 15, 20, 25, 30])
     highlight_ages: List[int] = field(default_factory=lambda: [65, 70, 75, 80])
@@ -68,6 +79,17 @@ class PolicyConfig:
     display: DisplaySettings
     yearly_data: List[YearlyRecord]
     withdrawal_data: List[WithdrawalRecord]
+    # Derived once at construction: first record with a non-zero withdrawal
+    first_withdrawal: Optional[WithdrawalRecord] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.first_withdrawal = next(
+            (wd for wd in self.withdrawal_data if wd.withdrawal_amount > 0), None)
+
+
+# Pull row values in field order so records can be built positionally
+_yearly_row_values = itemgetter(*[f.name for f in fields(YearlyRecord)])
+_withdrawal_row_values = itemgetter(*[f.name for f in fields(WithdrawalRecord)])
 
 
 def load_policy_from_dict(data: dict) -> PolicyConfig:
@@ -79,11 +101,13 @@ def load_policy_from_dict(data: dict) -> PolicyConfig:
     display_raw = data.get('display_settings', {})
     display = DisplaySettings(**display_raw)
 
-    yearly_data = [YearlyRecord(**row) for row in data['yearly_data']]
+    yearly_data = [YearlyRecord(*_yearly_row_values(row)) for row in data['yearly_data']]
 
     withdrawal_data = []
     if 'withdrawal_data' in data:
-        withdrawal_data = [WithdrawalRecord(**row) for row in data['withdrawal_data']]
+        withdrawal_data = [
+            WithdrawalRecord(*_withdrawal_row_values(row)) for row in data['withdrawal_data']
+        ]
 
     config = PolicyConfig(
         policy_info=policy_info,
@@ -103,8 +127,9 @@ def load_policy_from_dict(data: dict) -> PolicyConfig:
 
 def load_policy(json_path: str) -> PolicyConfig:
     """Load and validate policy JSON configuration."""
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     return load_policy_from_dict(data)
 
 
@@ -121,30 +146,79 @@ def validate_policy(config: PolicyConfig) -> List[str]:
         )
 
     # Check yearly data
-    for rec in config.yearly_data:
+    yearly_warnings, yearly_sequential = _validate_yearly(
+        config.yearly_data, pi.annual_premium, pi.payment_years, pi.age_at_issue,
+    )
+    warnings.extend(yearly_warnings)
+
+    # Check withdrawal data
+    withdrawal_warnings, withdrawal_sequential = _validate_withdrawals(config.withdrawal_data)
+    warnings.extend(withdrawal_warnings)
+
+    # Check year sequences (tracked during the record loops above)
+    if not yearly_sequential:
+        warnings.append("yearly_data years are not sequential")
+
+    if not withdrawal_sequential:
+        warnings.append("withdrawal_data years are not sequential")
+
+    return warnings
+
+
+def _validate_yearly(records: List[YearlyRecord], annual_premium: float,
+                     payment_years: int, age_at_issue: int) -> Tuple[List[str], bool]:
+    """Check each yearly record for A+B+C, cumulative premium and age consistency.
+
+    Takes plain scalars instead of the PolicyConfig so the loop body only
+    touches locals and record slots.
+
+    Returns (warnings, sequential) where sequential is False if any year
+    does not follow the previous one by exactly 1.
+    """
+    warnings = []
+    sequential = True
+    prev_year = None
+    for rec in records:
+        year = rec.year
+        if prev_year is not None and year != prev_year + 1:
+            sequential = False
+        prev_year = year
+
         # Check A+B+C = total
         calc_total = rec.guaranteed_cash_value + rec.reversionary_bonus + rec.terminal_dividend
         if abs(calc_total - rec.total_surrender_value) > 1:
             warnings.append(
-                f"Year {rec.year}: A+B+C ({calc_total}) != total_surrender ({rec.total_surrender_value})"
+                f"Year {year}: A+B+C ({calc_total}) != total_surrender ({rec.total_surrender_value})"
             )
 
         # Check cumulative premium
-        expected_prem = pi.annual_premium * min(rec.year, pi.payment_years)
+        expected_prem = annual_premium * (year if year < payment_years else payment_years)
         if abs(rec.cumulative_premium - expected_prem) > 0.01:
             warnings.append(
-                f"Year {rec.year}: cumulative_premium ({rec.cumulative_premium}) != expected ({expected_prem})"
+                f"Year {year}: cumulative_premium ({rec.cumulative_premium}) != expected ({expected_prem})"
             )
 
         # Check age
-        expected_age = pi.age_at_issue + rec.year
+        expected_age = age_at_issue + year
         if rec.age != expected_age:
             warnings.append(
-                f"Year {rec.year}: age ({rec.age}) != age_at_issue + year ({expected_age})"
+                f"Year {year}: age ({rec.age}) != age_at_issue + year ({expected_age})"
             )
+    return warnings, sequential
 
-    # Check withdrawal data
-    for rec in config.withdrawal_data:
+
+def _validate_withdrawals(records: List[WithdrawalRecord]) -> Tuple[List[str], bool]:
+    """Check each withdrawal record's remaining A+B+C against its total.
+
+    Returns (warnings, sequential) like _validate_yearly.
+    """
+    warnings = []
+    sequential = True
+    prev_year = None
+    for rec in records:
+        if prev_year is not None and rec.year != prev_year + 1:
+            sequential = False
+        prev_year = rec.year
         calc_total = (rec.remaining_surrender_guaranteed +
                       rec.remaining_surrender_bonus +
                       rec.remaining_surrender_terminal)
@@ -152,16 +226,4 @@ def validate_policy(config: PolicyConfig) -> List[str]:
             warnings.append(
                 f"Withdrawal Year {rec.year}: A+B+C ({calc_total}) != remaining_total ({rec.remaining_surrender_total})"
             )
-
-    # Check year sequences
-    if config.yearly_data:
-        years = [r.year for r in config.yearly_data]
-        if years != list(range(years[0], years[-1] + 1)):
-            warnings.append("yearly_data years are not sequential")
-
-    if config.withdrawal_data:
-        w_years = [r.year for r in config.withdrawal_data]
-        if w_years != list(range(w_years[0], w_years[-1] + 1)):
-            warnings.append("withdrawal_data years are not sequential")
-
-    return warnings
+    return warnings, sequential
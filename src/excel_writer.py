@@ -5,16 +5,41 @@ Generates a workbook with 3 sheets:
   2. No Withdrawal IRR Analysis
   3. With Withdrawal IRR Analysis
 """
+import functools
+
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, numbers
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
 from .config import PolicyConfig
 
+_ALIGN_CENTER = Alignment(horizontal='center')
+_ALIGN_RIGHT = Alignment(horizontal='right')
+_HEADER_ALIGN = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+# Column letters by 1-based index (_COL_LETTERS[1] == 'A')
+_COL_LETTERS = [''] + [get_column_letter(i) for i in range(1, 27)]
+
+# Last column letters of the fixed sheet layouts (10 and 8 columns)
+_NO_WD_LAST_COL = _COL_LETTERS[10]
+_WD_LAST_COL = _COL_LETTERS[8]
+
+# Named cell styles registered on every workbook (see _add_named_styles)
+_STYLE_CENTER = 'Report Center'
+_STYLE_NUMBER = 'Report Number'
+_STYLE_IRR = 'Report IRR'
+
 
 def create_excel_report(config: PolicyConfig, irr_results: list, output_path: str):
-    """Generate Excel workbook with IRR analysis."""
-    wb = Workbook()
+    """Generate Excel workbook with IRR analysis.
+
+    The workbook is built in write-only (streaming) mode: each sheet's column
+    widths, row heights and freeze panes are set up front and rows are
+    appended as fully styled WriteOnlyCell lists.
+    """
+    wb = Workbook(write_only=True)
+    _add_named_styles(wb, _get_styles(config))
 
     _write_summary_sheet(wb, config)
     _write_no_withdrawal_sheet(wb, config, irr_results)
@@ -25,8 +50,28 @@ def create_excel_report(config: PolicyConfig, irr_results: list, output_path: st
 
 
 def _get_styles(config: PolicyConfig):
-    """Create reusable styles based on brand config."""
-    primary = config.brand.primary_color.replace('#', '')
+    """Return reusable styles based on brand config."""
+    return _styles_for(config.brand.primary_color.replace('#', ''))
+
+
+def _add_named_styles(wb: Workbook, styles: dict):
+    """Register the data/IRR cell styles so cells can take them in one assignment."""
+    wb.add_named_style(NamedStyle(
+        name=_STYLE_CENTER, font=styles['data_font'],
+        border=styles['thin_border'], alignment=_ALIGN_CENTER,
+    ))
+    wb.add_named_style(NamedStyle(
+        name=_STYLE_NUMBER, font=styles['data_font'], border=styles['thin_border'],
+        alignment=_ALIGN_RIGHT, number_format='#,##0',
+    ))
+    wb.add_named_style(NamedStyle(
+        name=_STYLE_IRR, alignment=_ALIGN_RIGHT, number_format='0.00%',
+    ))
+
+
+@functools.lru_cache(maxsize=8)
+def _styles_for(primary: str):
+    """Build the style set for a brand primary color (cached per color)."""
     return {
         'header_fill': PatternFill(start_color=primary, fill_type="solid"),
         'header_font': Font(color="FFFFFF", bold=True, size=11, name="Arial"),
@@ -51,8 +96,7 @@ def _get_styles(config: PolicyConfig):
 
 def _write_summary_sheet(wb: Workbook, config: PolicyConfig):
     """Sheet 1: Policy Summary."""
-    ws = wb.active
-    ws.title = "保单摘要 Summary"
+    ws = wb.create_sheet("保单摘要 Summary")
     styles = _get_styles(config)
     pi = config.policy_info
 
@@ -62,15 +106,13 @@ def _write_summary_sheet(wb: Workbook, config: PolicyConfig):
     ws.column_dimensions['C'].width = 40
 
     # Title
-    ws.merge_cells('B2:C2')
-    cell = ws['B2']
-    cell.value = pi.product_name
-    cell.font = styles['title_font']
+    ws.append([])
+    ws.merged_cells.add('B2:C2')
+    ws.append([None, _font_cell(ws, pi.product_name, styles['title_font'])])
 
-    ws.merge_cells('B3:C3')
-    cell = ws['B3']
-    cell.value = pi.product_name_en
-    cell.font = Font(color="666666", size=12, name="Arial")
+    ws.merged_cells.add('B3:C3')
+    ws.append([None, _font_cell(ws, pi.product_name_en, Font(color="666666", size=12, name="Arial"))])
+    ws.append([])
 
     # Summary data
     summary_items = [
@@ -88,47 +130,91 @@ def _write_summary_sheet(wb: Workbook, config: PolicyConfig):
 
     row = 5
     for label, value in summary_items:
-        ws.cell(row=row, column=2, value=label).font = styles['label_font']
-        ws.cell(row=row, column=3, value=value).font = styles['value_font']
+        _append_label_row(ws, label, value, styles)
         row += 1
 
     # Withdrawal info
     if config.withdrawal_data:
+        ws.append([])
         row += 1
-        ws.merge_cells(f'B{row}:C{row}')
-        ws.cell(row=row, column=2, value="现金提取方案 Withdrawal Plan").font = styles['subtitle_font']
-        row += 1
+        ws.merged_cells.add(f'B{row}:C{row}')
+        ws.append([None, _font_cell(ws, "现金提取方案 Withdrawal Plan", styles['subtitle_font'])])
+
+        # Find first withdrawal, withdrawal count and total in one pass
+        first_wd = None
+        n_withdrawals = 0
+        total_withdrawals = 0.0
+        for wd in config.withdrawal_data:
+            amount = wd.withdrawal_amount
+            total_withdrawals += amount
+            if amount > 0:
+                n_withdrawals += 1
+                if first_wd is None:
+                    first_wd = wd
 
-        # Find first and last withdrawal year and amounts
-        first_wd = next((wd for wd in config.withdrawal_data if wd.withdrawal_amount > 0), None)
         if first_wd:
-            ws.cell(row=row, column=2, value="首次提取年期 First Withdrawal").font = styles['label_font']
-            ws.cell(row=row, column=3, value=f"Year {first_wd.year}").font = styles['value_font']
-            row += 1
-            ws.cell(row=row, column=2, value="每年提取金额 Annual Amount").font = styles['label_font']
-            ws.cell(row=row, column=3, value=f"{pi.currency_symbol}{first_wd.withdrawal_amount:,.0f}").font = styles['value_font']
-            row += 1
+            _append_label_row(ws, "首次提取年期 First Withdrawal", f"Year {first_wd.year}", styles)
+            _append_label_row(ws, "每年提取金额 Annual Amount",
+                              f"{pi.currency_symbol}{first_wd.withdrawal_amount:,.0f}", styles)
+            _append_label_row(ws, "累计提取金额 Total Withdrawals",
+                              f"{pi.currency_symbol}{total_withdrawals:,.0f} (over {n_withdrawals} years)",
+                              styles)
+
+
+def _font_cell(ws, value, font):
+    """Create a write-only cell with the given font."""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = font
+    return cell
+
 
-            total_withdrawals = sum(wd.withdrawal_amount for wd in config.withdrawal_data)
-            ws.cell(row=row, column=2, value="累计提取金额 Total Withdrawals").font = styles['label_font']
-            ws.cell(row=row, column=3, value=f"{pi.currency_symbol}{total_withdrawals:,.0f} (over {sum(1 for wd in config.withdrawal_data if wd.withdrawal_amount > 0)} years)").font = styles['value_font']
+def _append_label_row(ws, label, value, styles):
+    """Append a summary row with the label in column B and the value in column C."""
+    ws.append([
+        None,
+        _font_cell(ws, label, styles['label_font']),
+        _font_cell(ws, value, styles['value_font']),
+    ])
 
 
-def _format_irr_cell(ws, row, col, irr_value, styles):
-    """Format an IRR cell with color coding."""
-    cell = ws.cell(row=row, column=col)
+def _format_irr_cell(ws, irr_value, styles):
+    """Create an IRR cell with color coding."""
+    cell = WriteOnlyCell(ws)
     if irr_value is None:
         cell.value = "N/A"
         cell.font = styles['irr_na_font']
-        cell.alignment = Alignment(horizontal='center')
+        cell.alignment = _ALIGN_CENTER
     else:
         cell.value = irr_value
-        cell.number_format = '0.00%'
+        cell.style = _STYLE_IRR
         if irr_value >= 0:
             cell.font = styles['irr_positive_font']
         else:
             cell.font = styles['irr_negative_font']
-        cell.alignment = Alignment(horizontal='right')
+    return cell
+
+
+def _row_fill(year, age, highlight_years, highlight_ages, styles):
+    """Return the highlight fill for a data row, or None if not highlighted."""
+    if year in highlight_years:
+        return styles['year_highlight']
+    if age in highlight_ages:
+        return styles['age_highlight']
+    return None
+
+
+def _append_header_row(ws, headers, widths, styles):
+    """Set the column widths and append the styled header row in one pass."""
+    header_cells = []
+    for col, (header, width) in enumerate(zip(headers, widths), 1):
+        ws.column_dimensions[_COL_LETTERS[col]].width = width
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = styles['header_fill']
+        cell.font = styles['header_font']
+        cell.alignment = _HEADER_ALIGN
+        cell.border = styles['thin_border']
+        header_cells.append(cell)
+    ws.append(header_cells)
 
 
 def _write_no_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results: list):
@@ -148,30 +234,27 @@ def _write_no_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results:
         f"Death Benefit\n身故赔偿 ({pi.currency})",
     ]
 
-    # Write headers
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = styles['header_fill']
-        cell.font = styles['header_font']
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        cell.border = styles['thin_border']
-
     # Column widths
     widths = [8, 8, 18, 18, 16, 16, 18, 16, 16, 18]
-    for i, w in enumerate(widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
 
     # Header row height
     ws.row_dimensions[1].height = 40
 
+    # Freeze panes (written with the sheet header, so set before any row)
+    ws.freeze_panes = 'A2'
+
+    _append_header_row(ws, headers, widths, styles)
+
     # Write data
     highlight_years = set(config.display.highlight_years)
     highlight_ages = set(config.display.highlight_ages)
 
-    for i, (rec, irr) in enumerate(zip(config.yearly_data, irr_results)):
-        row = i + 2
-        is_year_highlight = rec.year in highlight_years
-        is_age_highlight = rec.age in highlight_ages
+    # Per-column named style for the data cells:
+    # Year/Age centered, money columns right-aligned
+    col_styles = [_STYLE_CENTER] * 2 + [_STYLE_NUMBER] * 5
+
+    for rec, irr in zip(config.yearly_data, irr_results):
+        row_fill = _row_fill(rec.year, rec.age, highlight_years, highlight_ages, styles)
 
         # Data cells
         data = [
@@ -180,45 +263,30 @@ def _write_no_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results:
             rec.terminal_dividend, rec.total_surrender_value,
         ]
 
-        for col, val in enumerate(data, 1):
-            cell = ws.cell(row=row, column=col, value=val)
-            cell.font = styles['data_font']
-            cell.border = styles['thin_border']
-            if col >= 3:
-                cell.number_format = '#,##0'
-                cell.alignment = Alignment(horizontal='right')
-            else:
-                cell.alignment = Alignment(horizontal='center')
-
-            # Apply highlight
-            if is_year_highlight:
-                cell.fill = styles['year_highlight']
-            elif is_age_highlight:
-                cell.fill = styles['age_highlight']
+        row_cells = []
+        for val, style_name in zip(data, col_styles):
+            cell = WriteOnlyCell(ws, value=val)
+            cell.style = style_name
+            row_cells.append(cell)
 
         # IRR cells
-        _format_irr_cell(ws, row, 8, irr['irr_no_withdrawal_guaranteed'], styles)
-        _format_irr_cell(ws, row, 9, irr['irr_no_withdrawal_total'], styles)
+        row_cells.append(_format_irr_cell(ws, irr['irr_no_withdrawal_guaranteed'], styles))
+        row_cells.append(_format_irr_cell(ws, irr['irr_no_withdrawal_total'], styles))
 
         # Death benefit
-        cell = ws.cell(row=row, column=10, value=rec.total_death_benefit)
-        cell.font = styles['data_font']
-        cell.number_format = '#,##0'
-        cell.alignment = Alignment(horizontal='right')
-        cell.border = styles['thin_border']
+        cell = WriteOnlyCell(ws, value=rec.total_death_benefit)
+        cell.style = _STYLE_NUMBER
+        row_cells.append(cell)
 
-        # Apply highlight to IRR and death benefit cells too
-        for col in [8, 9, 10]:
-            if is_year_highlight:
-                ws.cell(row=row, column=col).fill = styles['year_highlight']
-            elif is_age_highlight:
-                ws.cell(row=row, column=col).fill = styles['age_highlight']
+        # Apply highlight to the whole row
+        if row_fill is not None:
+            for cell in row_cells:
+                cell.fill = row_fill
 
-    # Freeze panes
-    ws.freeze_panes = 'A2'
+        ws.append(row_cells)
 
     # Auto-filter
-    ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{len(config.yearly_data) + 1}"
+    ws.auto_filter.ref = f"A1:{_NO_WD_LAST_COL}{len(config.yearly_data) + 1}"
 
 
 def _write_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results: list):
@@ -237,41 +305,39 @@ def _write_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results: lis
         "IRR (Total)\n预期IRR",
     ]
 
-    # Write headers
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = styles['header_fill']
-        cell.font = styles['header_font']
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        cell.border = styles['thin_border']
-
     # Column widths
     widths = [8, 8, 16, 20, 20, 20, 16, 16]
-    for i, w in enumerate(widths, 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
 
     ws.row_dimensions[1].height = 40
 
-    # Build withdrawal lookup and calculate cumulative
+    # Freeze panes (written with the sheet header, so set before any row)
+    ws.freeze_panes = 'A2'
+
+    _append_header_row(ws, headers, widths, styles)
+
+    # Walk the IRR results in year order; the last record wins for a repeated
+    # withdrawal year, and the file's own record order doesn't matter
     wd_by_year = {wd.year: wd for wd in config.withdrawal_data}
     cumulative_wd = 0.0
 
     highlight_years = set(config.display.highlight_years)
     highlight_ages = set(config.display.highlight_ages)
 
-    for i, irr in enumerate(irr_results):
-        year = irr['year']
-        age = irr['age']
+    # Per-column named style for the data cells
+    col_styles = [_STYLE_CENTER] * 2 + [_STYLE_NUMBER] * 4
 
-        if year not in wd_by_year:
+    row = 1
+    for irr in irr_results:
+        year = irr['year']
+        wd_rec = wd_by_year.get(year)
+        if wd_rec is None:
             continue
 
-        wd_rec = wd_by_year[year]
+        age = irr['age']
         cumulative_wd += wd_rec.withdrawal_amount
 
-        row = ws.max_row + 1 if ws.max_row > 1 else 2
-        is_year_highlight = year in highlight_years
-        is_age_highlight = age in highlight_ages
+        row += 1
+        row_fill = _row_fill(year, age, highlight_years, highlight_ages, styles)
 
         data = [
             year, age,
@@ -281,35 +347,23 @@ def _write_withdrawal_sheet(wb: Workbook, config: PolicyConfig, irr_results: lis
             wd_rec.remaining_surrender_total,
         ]
 
-        for col, val in enumerate(data, 1):
-            cell = ws.cell(row=row, column=col, value=val)
-            cell.font = styles['data_font']
-            cell.border = styles['thin_border']
-            if col >= 3:
-                cell.number_format = '#,##0'
-                cell.alignment = Alignment(horizontal='right')
-            else:
-                cell.alignment = Alignment(horizontal='center')
-
-            if is_year_highlight:
-                cell.fill = styles['year_highlight']
-            elif is_age_highlight:
-                cell.fill = styles['age_highlight']
+        row_cells = []
+        for val, style_name in zip(data, col_styles):
+            cell = WriteOnlyCell(ws, value=val)
+            cell.style = style_name
+            row_cells.append(cell)
 
         # IRR cells
-        _format_irr_cell(ws, row, 7, irr['irr_withdrawal_guaranteed'], styles)
-        _format_irr_cell(ws, row, 8, irr['irr_withdrawal_total'], styles)
+        row_cells.append(_format_irr_cell(ws, irr['irr_withdrawal_guaranteed'], styles))
+        row_cells.append(_format_irr_cell(ws, irr['irr_withdrawal_total'], styles))
 
-        for col in [7, 8]:
-            if is_year_highlight:
-                ws.cell(row=row, column=col).fill = styles['year_highlight']
-            elif is_age_highlight:
-                ws.cell(row=row, column=col).fill = styles['age_highlight']
+        # Apply highlight to the whole row
+        if row_fill is not None:
+            for cell in row_cells:
+                cell.fill = row_fill
 
-    # Freeze panes
-    ws.freeze_panes = 'A2'
+        ws.append(row_cells)
 
     # Auto-filter
-    max_row = ws.max_row
-    if max_row > 1:
-        ws.auto_filter.ref = f"A1:{get_column_letter(len(headers))}{max_row}"
+    if row > 1:
+        ws.auto_filter.ref = f"A1:{_WD_LAST_COL}{row}"
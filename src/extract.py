@@ -14,6 +14,11 @@ import json
 import sys
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
 from .pdf_extractor import AIAPDFExtractor
 from .config import load_policy_from_dict
 
@@ -128,8 +133,11 @@ Examples:
         output_path = f"policy_data/{pdf_stem}.json"
 
     Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if orjson is not None:
+        Path(output_path).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
     print(f"\n💾 Saved JSON: {output_path}")
 
     # 5. Optionally run IRR analysis
@@ -2,12 +2,40 @@
 HTML report generation for PPT presentation.
 Self-contained HTML with embedded CSS and Chart.js.
 """
+import base64
+import contextlib
+import gzip
+import hashlib
 import json as json_module
+import os
+import pickle
+import shutil
+import string
+import tempfile
+import time
+from operator import attrgetter
+from pathlib import Path
+
 from .config import PolicyConfig
 
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is used otherwise
+    orjson = None
+
+
+def create_html_report(config: PolicyConfig, irr_results: list, output_path: str,
+                       cache_dir: str = None):
+    """Generate a self-contained HTML report.
+
+    If output_path ends in '.gz' the report is written gzip-compressed.
+    If cache_dir is given, reports are cached there keyed by a hash of the
+    inputs, and a repeat call with identical inputs copies the cached file.
+    """
+    if cache_dir is not None:
+        _create_html_report_cached(config, irr_results, output_path, Path(cache_dir))
+        return
 
-def create_html_report(config: PolicyConfig, irr_results: list, output_path: str):
-    """Generate a self-contained HTML report."""
     pi = config.policy_info
     brand = config.brand
 
@@ -15,31 +43,21 @@ def create_html_report(config: PolicyConfig, irr_results: list, output_path: str
     key_years = set(config.display.highlight_years)
     key_ages = set(config.display.highlight_ages)
 
-    key_indices = [
-        i for i, r in enumerate(irr_results)
-        if r['year'] in key_years or r['age'] in key_ages
+    # Row class per result index, shared by both table builders
+    highlight_classes = [
+        ' class="highlight"' if r['year'] in key_years
+        else ' class="highlight-age"' if r['age'] in key_ages
+        else ''
+        for r in irr_results
     ]
+    key_indices = [i for i, cls in enumerate(highlight_classes) if cls]
 
     # Prepare chart data (filter to years 3+ where IRR is meaningful)
-    chart_labels = []
-    chart_nw_total = []
-    chart_wd_total = []
-
-    for r in irr_results:
-        if r['year'] < 3:
-            continue
-        chart_labels.append(r['year'])
-
-        nw_t = r['irr_no_withdrawal_total']
-        wd_t = r['irr_withdrawal_total']
-
-        chart_nw_total.append(round(nw_t * 100, 2) if nw_t is not None else None)
-        chart_wd_total.append(round(wd_t * 100, 2) if wd_t is not None else None)
-
+    chart_results = [r for r in irr_results if r['year'] >= 3]
     chart_data = {
-        'labels': chart_labels,
-        'nw_total': chart_nw_total,
-        'wd_total': chart_wd_total,
+        'labels': [r['year'] for r in chart_results],
+        'nw_total': _irr_percent_column([r['irr_no_withdrawal_total'] for r in chart_results]),
+        'wd_total': _irr_percent_column([r['irr_withdrawal_total'] for r in chart_results]),
     }
 
     # Prepare cash value chart data (all years)
@@ -47,17 +65,11 @@ def create_html_report(config: PolicyConfig, irr_results: list, output_path: str
     cv_nw_total = [r.total_surrender_value for r in config.yearly_data]
 
     # Withdrawal scenario: total value = remaining surrender + cumulative withdrawals
+    withdrawal_data = sorted(config.withdrawal_data, key=attrgetter('year'))
     cv_wd_total = []
-    if config.withdrawal_data:
-        wd_by_year = {wd.year: wd for wd in config.withdrawal_data}
-        cum_wd = 0.0
-        for r in config.yearly_data:
-            if r.year in wd_by_year:
-                cum_wd += wd_by_year[r.year].withdrawal_amount
-                remaining = wd_by_year[r.year].remaining_surrender_total or 0
-                cv_wd_total.append(remaining + cum_wd)
-            else:
-                cv_wd_total.append(None)
+    cumulative_wd = []
+    if withdrawal_data:
+        cumulative_wd, cv_wd_total = _merge_withdrawals(config.yearly_data, withdrawal_data)
 
     cv_chart_data = {
         'labels': cv_labels,
@@ -66,23 +78,33 @@ def create_html_report(config: PolicyConfig, irr_results: list, output_path: str
         'total_premium': pi.total_premium,
     }
 
-    # Build no-withdrawal key rows HTML
-    nw_rows_html = _build_nw_table_rows(config, irr_results, key_indices)
-
-    # Build withdrawal key rows HTML
-    wd_rows_html = _build_wd_table_rows(config, irr_results, key_indices)
-
-    # Build full data tables
-    full_nw_rows = _build_nw_table_rows(config, irr_results, list(range(len(irr_results))))
-    full_wd_rows = _build_wd_table_rows(config, irr_results, list(range(len(irr_results))))
+    # Build every table row once (one entry per result index); the key
+    # tables select rows by index and the full tables use all of them.
+    # When every year is a key year the two tables share one list.
+    # The row lists are streamed into the file by _write_template.
+    all_key = len(key_indices) == len(irr_results)
+    all_nw_rows = _build_nw_table_rows(config, irr_results, highlight_classes)
+    full_nw_rows = all_nw_rows
+    nw_rows_html = full_nw_rows if all_key else [all_nw_rows[i] for i in key_indices]
+
+    if withdrawal_data:
+        all_wd_rows = _build_wd_table_rows(
+            withdrawal_data, cumulative_wd, irr_results, highlight_classes)
+        full_wd_rows = [row for row in all_wd_rows if row is not None]
+        if all_key:
+            wd_rows_html = full_wd_rows
+        else:
+            wd_rows_html = [all_wd_rows[i] for i in key_indices if all_wd_rows[i] is not None]
+    else:
+        wd_rows_html = full_wd_rows = _NO_WD_ROW
 
     # Withdrawal description
-    first_wd = next((wd for wd in config.withdrawal_data if wd.withdrawal_amount > 0), None)
+    first_wd = config.first_withdrawal
     wd_desc = ""
     if first_wd:
         wd_desc = f"从第{first_wd.year}年起每年提取 {pi.currency_symbol}{first_wd.withdrawal_amount:,.0f}"
 
-    html = _HTML_TEMPLATE.format(
+    values = dict(
         product_name=pi.product_name,
         product_name_en=pi.product_name_en,
         insurer=pi.insurer,
@@ -99,8 +121,9 @@ def create_html_report(config: PolicyConfig, irr_results: list, output_path: str
         primary_color=brand.primary_color,
         accent_color=brand.accent_color,
         logo_text=brand.logo_text,
-        chart_data_json=json_module.dumps(chart_data),
-        cv_chart_data_json=json_module.dumps(cv_chart_data),
+        logo_src=_LOGO_SRC,
+        chart_data_json=_dumps_json(chart_data),
+        cv_chart_data_json=_dumps_json(cv_chart_data),
         nw_rows=nw_rows_html,
         wd_rows=wd_rows_html,
         full_nw_rows=full_nw_rows,
@@ -109,8 +132,36 @@ def create_html_report(config: PolicyConfig, irr_results: list, output_path: str
         has_withdrawal='true' if config.withdrawal_data else 'false',
     )
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    with _open_report(output_path) as f:
+        _write_template(f, values)
+
+
+@contextlib.contextmanager
+def _open_report(output_path):
+    """Open the report for binary writing, gzip-compressed for '.gz' paths.
+
+    The gzip header carries no file name and mtime=0, so compressed output
+    is byte-identical across runs and paths.
+    """
+    with open(output_path, 'wb') as raw:
+        if not str(output_path).endswith('.gz'):
+            yield raw
+            return
+        with gzip.GzipFile(filename='', mode='wb', fileobj=raw,
+                           compresslevel=6, mtime=0) as f:
+            yield f
+
+
+def _dumps_json(obj):
+    """Serialize chart data to compact JSON for embedding in the page."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json_module.dumps(obj, separators=(',', ':'))
+
+
+def _irr_percent_column(values):
+    """Convert a column of IRR rates to percentages rounded for the chart."""
+    return [round(v * 100, 2) if v is not None else None for v in values]
 
 
 def _fmt_irr(val):
@@ -122,79 +173,205 @@ def _fmt_irr(val):
     return f'<span class="{css_class}">{pct:.2f}%</span>'
 
 
-def _fmt_money(val):
-    """Format currency value."""
-    if val is None:
-        return '-'
-    return f"{val:,.0f}"
+_MONEY_FORMAT = '{:,.0f}'.format
 
 
-def _build_nw_table_rows(config, irr_results, indices):
-    """Build HTML table rows for no-withdrawal scenario."""
-    rows = []
-    pi = config.policy_info
-    for i in indices:
-        rec = config.yearly_data[i]
-        irr = irr_results[i]
-        highlight = ''
-        if rec.year in config.display.highlight_years:
-            highlight = ' class="highlight"'
-        elif rec.age in config.display.highlight_ages:
-            highlight = ' class="highlight-age"'
-
-        rows.append(f"""<tr{highlight}>
-            <td class="center">{rec.year}</td>
-            <td class="center">{rec.age}</td>
-            <td class="right">{_fmt_money(rec.cumulative_premium)}</td>
-            <td class="right">{_fmt_money(rec.guaranteed_cash_value)}</td>
-            <td class="right">{_fmt_money(rec.total_surrender_value)}</td>
-            <td class="right">{_fmt_irr(irr['irr_no_withdrawal_total'])}</td>
-            <td class="right">{_fmt_money(rec.total_death_benefit)}</td>
-        </tr>""")
-    return '\n'.join(rows)
-
-
-def _build_wd_table_rows(config, irr_results, indices):
-    """Build HTML table rows for withdrawal scenario."""
-    if not config.withdrawal_data:
-        return '<tr><td colspan="7" class="center">No withdrawal data</td></tr>'
-
-    wd_by_year = {wd.year: wd for wd in config.withdrawal_data}
-    cumulative_wd = 0.0
-
-    # Pre-calculate cumulative withdrawals
-    cum_map = {}
+def _fmt_money_column(values):
+    """Format a column of currency values in one pass ('-' for None)."""
+    fmt = _MONEY_FORMAT
+    return [fmt(v) if v is not None else '-' for v in values]
+
+
+def _fmt_irr_column(values):
+    """Format a column of IRR values in one pass (see _fmt_irr)."""
+    return list(map(_fmt_irr, values))
+
+
+def _build_nw_table_rows(config, irr_results, highlight_classes):
+    """Build one HTML table row per result for the no-withdrawal scenario."""
+    yearly_data = config.yearly_data
+
+    # Format each displayed column in one batch
+    cum_premium_col = _fmt_money_column([r.cumulative_premium for r in yearly_data])
+    guaranteed_col = _fmt_money_column([r.guaranteed_cash_value for r in yearly_data])
+    surrender_col = _fmt_money_column([r.total_surrender_value for r in yearly_data])
+    death_col = _fmt_money_column([r.total_death_benefit for r in yearly_data])
+    irr_col = _fmt_irr_column([r['irr_no_withdrawal_total'] for r in irr_results])
+
+    # zip stops at the shortest column, i.e. after len(irr_results) rows
+    return [
+        f'<tr{highlight}>'
+        f'<td class="center">{rec.year}</td>'
+        f'<td class="center">{rec.age}</td>'
+        f'<td class="right">{cum_premium}</td>'
+        f'<td class="right">{guaranteed}</td>'
+        f'<td class="right">{surrender}</td>'
+        f'<td class="right">{irr}</td>'
+        f'<td class="right">{death}</td>'
+        '</tr>'
+        for highlight, rec, cum_premium, guaranteed, surrender, irr, death in zip(
+            highlight_classes, yearly_data, cum_premium_col, guaranteed_col,
+            surrender_col, irr_col, death_col)
+    ]
+
+
+_LOGO_URL = "https://companieslogo.com/img/orig/1299.HK_BIG.D-f5e85a14.png?t=1720244490"
+_LOGO_PATH = Path(__file__).parent / 'assets' / 'logo.png'
+
+
+def _load_logo_src():
+    """Embed assets/logo.png as a data URI if present, else use the remote URL."""
+    try:
+        data = _LOGO_PATH.read_bytes()
+    except OSError:
+        return _LOGO_URL
+    return 'data:image/png;base64,' + base64.b64encode(data).decode('ascii')
+
+
+_LOGO_SRC = _load_logo_src()
+
+_HTML_CACHE_MAX_FILES = 64
+# Temp files older than this were left by a killed render
+_HTML_CACHE_TMP_MAX_AGE = 3600
+
+
+def _create_html_report_cached(config, irr_results, output_path, cache_dir):
+    """Render through the disk cache, evicting least recently used entries."""
+    digest = hashlib.blake2b(_TEMPLATE_DIGEST)
+    digest.update(pickle.dumps((config, irr_results), protocol=5))
+    key = digest.hexdigest()
+    compressed = str(output_path).endswith('.gz')
+    cached = cache_dir / (f"{key}.html.gz" if compressed else f"{key}.html")
+
+    try:
+        os.utime(cached)  # mark as recently used
+        shutil.copyfile(cached, output_path)
+        return
+    except FileNotFoundError:
+        pass  # not cached, or just evicted by another process sharing the dir
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    # Unique per call, since threads may render the same key at once; keep
+    # the .gz ending so the temp file is compressed like the entry
+    fd, tmp_path = tempfile.mkstemp(
+        dir=cache_dir, prefix=f'{key}.', suffix='.tmp.gz' if compressed else '.tmp')
+    os.close(fd)
+    try:
+        create_html_report(config, irr_results, tmp_path)
+        # Copy out before publishing: once in place the entry may be evicted
+        shutil.copyfile(tmp_path, output_path)
+        os.replace(tmp_path, cached)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _evict_html_cache(cache_dir)
+
+
+def _evict_html_cache(cache_dir):
+    """Keep at most _HTML_CACHE_MAX_FILES reports, dropping the oldest used.
+
+    Also removes stale temp files. Other processes may share the directory,
+    so files can disappear at any point.
+    """
+    stale_before = time.time() - _HTML_CACHE_TMP_MAX_AGE
+    entries = []
+    for path in cache_dir.iterdir():
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if path.name.endswith(('.tmp', '.tmp.gz')):
+            if mtime < stale_before:
+                path.unlink(missing_ok=True)
+        elif path.name.endswith(('.html', '.html.gz')):
+            entries.append((mtime, path))
+    entries.sort()
+    for _, path in entries[:-_HTML_CACHE_MAX_FILES]:
+        path.unlink(missing_ok=True)
+
+
+_NO_WD_ROW = '<tr><td colspan="7" class="center">No withdrawal data</td></tr>'
+
+
+def _merge_withdrawals(yearly_data, withdrawal_data):
+    """Walk the yearly and withdrawal records (both sorted by year) together.
+
+    Returns (cumulative, cv_wd_total): the running withdrawal total for each
+    withdrawal record, and for each yearly record the remaining surrender
+    value plus cumulative withdrawals (None for years without a withdrawal).
+    The table's running total counts every withdrawal record; the chart's
+    only counts withdrawals in years that are in the projection.
+    """
+    cumulative = []
+    cv_wd_total = []
     running = 0.0
-    for wd in config.withdrawal_data:
-        running += wd.withdrawal_amount
-        cum_map[wd.year] = running
+    matched = 0.0
+    j = 0
+    n = len(withdrawal_data)
+    for rec in yearly_data:
+        year = rec.year
+        while j < n and withdrawal_data[j].year < year:
+            running += withdrawal_data[j].withdrawal_amount
+            cumulative.append(running)
+            j += 1
+        if j < n and withdrawal_data[j].year == year:
+            wd = withdrawal_data[j]
+            running += wd.withdrawal_amount
+            matched += wd.withdrawal_amount
+            cumulative.append(running)
+            cv_wd_total.append((wd.remaining_surrender_total or 0) + matched)
+            j += 1
+        else:
+            cv_wd_total.append(None)
+    while j < n:
+        running += withdrawal_data[j].withdrawal_amount
+        cumulative.append(running)
+        j += 1
+    return cumulative, cv_wd_total
+
+
+def _build_wd_table_rows(withdrawal_data, cumulative, irr_results, highlight_classes):
+    """Build HTML table rows for withdrawal scenario.
+
+    withdrawal_data is sorted by year and cumulative holds its running
+    withdrawal totals (see _merge_withdrawals).
+    Returns one entry per result; None for years without withdrawal data.
+    """
+    # Format each displayed column in one batch (indexed like withdrawal_data)
+    amount_col = _fmt_money_column([wd.withdrawal_amount for wd in withdrawal_data])
+    cumulative_col = _fmt_money_column(cumulative)
+    guaranteed_col = _fmt_money_column([wd.remaining_surrender_guaranteed for wd in withdrawal_data])
+    total_col = _fmt_money_column([wd.remaining_surrender_total for wd in withdrawal_data])
+
+    wd_years = [wd.year for wd in withdrawal_data]
+    fmt_irr = _fmt_irr
 
     rows = []
-    for i in indices:
-        irr = irr_results[i]
+    append = rows.append
+    j = 0
+    n = len(wd_years)
+    for highlight, irr in zip(highlight_classes, irr_results):
         year = irr['year']
         age = irr['age']
 
-        if year not in wd_by_year:
+        while j < n and wd_years[j] < year:
+            j += 1
+        if j == n or wd_years[j] != year:
+            append(None)
             continue
 
-        wd_rec = wd_by_year[year]
-        highlight = ''
-        if year in config.display.highlight_years:
-            highlight = ' class="highlight"'
-        elif age in config.display.highlight_ages:
-            highlight = ' class="highlight-age"'
-
-        rows.append(f"""<tr{highlight}>
-            <td class="center">{year}</td>
-            <td class="center">{age}</td>
-            <td class="right">{_fmt_money(wd_rec.withdrawal_amount)}</td>
-            <td class="right">{_fmt_money(cum_map.get(year, 0))}</td>
-            <td class="right">{_fmt_money(wd_rec.remaining_surrender_guaranteed)}</td>
-            <td class="right">{_fmt_money(wd_rec.remaining_surrender_total)}</td>
-            <td class="right">{_fmt_irr(irr['irr_withdrawal_total'])}</td>
-        </tr>""")
-    return '\n'.join(rows)
+        append(
+            f'<tr{highlight}>'
+            f'<td class="center">{year}</td>'
+            f'<td class="center">{age}</td>'
+            f'<td class="right">{amount_col[j]}</td>'
+            f'<td class="right">{cumulative_col[j]}</td>'
+            f'<td class="right">{guaranteed_col[j]}</td>'
+            f'<td class="right">{total_col[j]}</td>'
+            f'<td class="right">{fmt_irr(irr["irr_withdrawal_total"])}</td>'
+            '</tr>'
+        )
+    return rows
 
 
 _HTML_TEMPLATE = """<!DOCTYPE html>
@@ -203,8 +380,8 @@ _HTML_TEMPLATE = """<!DOCTYPE html>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>{product_name} - IRR Analysis</title>
-<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
-<script src="https://cdn.jsdelivr.net/npm/chartjs-plugin-annotation@3.0.1/dist/chartjs-plugin-annotation.min.js"></script>
+<script defer src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
+<script defer src="https://cdn.jsdelivr.net/npm/chartjs-plugin-annotation@3.0.1/dist/chartjs-plugin-annotation.min.js"></script>
 <style>
 :root {{
     --primary: {primary_color};
@@ -434,7 +611,7 @@ tr:hover {{ background: #f5f5f5; }}
 <!-- Header -->
 <div class="header">
     <div class="header-inner">
-        <img src="https://companieslogo.com/img/orig/1299.HK_BIG.D-f5e85a14.png?t=1720244490" alt="{logo_text}" class="logo-img">
+        <img src="{logo_src}" alt="{logo_text}" class="logo-img">
         <div class="header-text">
             <h1>{product_name}</h1>
             <p>IRR Analysis Report | 内部收益率分析报告</p>
@@ -611,239 +788,242 @@ tr:hover {{ background: #f5f5f5; }}
 </div>
 
 <script>
-// Cash Value Chart
-const cvData = {cv_chart_data_json};
-const cvCtx = document.getElementById('cvChart').getContext('2d');
-const cvDatasets = [
-    {{
-        label: '不提取 退保总额 No Withdrawal Surrender',
-        data: cvData.nw_total,
-        borderColor: '{primary_color}',
-        backgroundColor: 'rgba(200, 16, 46, 0.05)',
-        borderWidth: 2.5,
-        fill: false,
-        tension: 0.3,
-        pointRadius: 0,
-        pointHitRadius: 10,
-    }},
-];
-if (cvData.wd_total && cvData.wd_total.length > 0) {{
-    cvDatasets.push({{
-        label: '提取 总价值 Withdrawal Total Value',
-        data: cvData.wd_total,
-        borderColor: '#1565C0',
-        borderWidth: 2.5,
-        fill: false,
-        tension: 0.3,
-        pointRadius: 0,
-        pointHitRadius: 10,
-        spanGaps: true,
-    }});
-}}
-new Chart(cvCtx, {{
-    type: 'line',
-    data: {{
-        labels: cvData.labels,
-        datasets: cvDatasets,
-    }},
-    options: {{
-        responsive: true,
-        maintainAspectRatio: false,
-        interaction: {{
-            mode: 'index',
-            intersect: false,
+// Chart.js is loaded with defer; build the charts once it has run
+document.addEventListener('DOMContentLoaded', () => {{
+    // Cash Value Chart
+    const cvData = {cv_chart_data_json};
+    const cvCtx = document.getElementById('cvChart').getContext('2d');
+    const cvDatasets = [
+        {{
+            label: '不提取 退保总额 No Withdrawal Surrender',
+            data: cvData.nw_total,
+            borderColor: '{primary_color}',
+            backgroundColor: 'rgba(200, 16, 46, 0.05)',
+            borderWidth: 2.5,
+            fill: false,
+            tension: 0.3,
+            pointRadius: 0,
+            pointHitRadius: 10,
         }},
-        plugins: {{
-            tooltip: {{
-                callbacks: {{
-                    label: function(ctx) {{
-                        if (ctx.parsed.y === null) return null;
-                        return ctx.dataset.label + ': $' + ctx.parsed.y.toLocaleString();
-                    }}
-                }}
-            }},
-            legend: {{
-                position: 'bottom',
-                labels: {{
-                    usePointStyle: true,
-                    padding: 16,
-                    font: {{ size: 12 }}
-                }}
+    ];
+    if (cvData.wd_total && cvData.wd_total.length > 0) {{
+        cvDatasets.push({{
+            label: '提取 总价值 Withdrawal Total Value',
+            data: cvData.wd_total,
+            borderColor: '#1565C0',
+            borderWidth: 2.5,
+            fill: false,
+            tension: 0.3,
+            pointRadius: 0,
+            pointHitRadius: 10,
+            spanGaps: true,
+        }});
+    }}
+    new Chart(cvCtx, {{
+        type: 'line',
+        data: {{
+            labels: cvData.labels,
+            datasets: cvDatasets,
+        }},
+        options: {{
+            responsive: true,
+            maintainAspectRatio: false,
+            interaction: {{
+                mode: 'index',
+                intersect: false,
             }},
-            annotation: {{
-                annotations: {{
-                    premiumLine: {{
-                        type: 'line',
-                        yMin: cvData.total_premium,
-                        yMax: cvData.total_premium,
-                        borderColor: '#999',
-                        borderWidth: 1.5,
-                        borderDash: [6, 4],
-                        label: {{
-                            content: 'Total Premium $' + cvData.total_premium.toLocaleString(),
-                            display: true,
-                            position: 'start',
-                            font: {{ size: 10 }},
-                            color: '#666',
-                            backgroundColor: 'rgba(255,255,255,0.8)',
+            plugins: {{
+                tooltip: {{
+                    callbacks: {{
+                        label: function(ctx) {{
+                            if (ctx.parsed.y === null) return null;
+                            return ctx.dataset.label + ': $' + ctx.parsed.y.toLocaleString();
                         }}
                     }}
-                }}
-            }}
-        }},
-        scales: {{
-            x: {{
-                title: {{
-                    display: true,
-                    text: 'Policy Year 保单年期',
-                    font: {{ size: 13 }}
                 }},
-                ticks: {{
-                    callback: function(val, idx) {{
-                        const label = cvData.labels[idx];
-                        return (label % 5 === 0) ? label : '';
-                    }},
-                    maxRotation: 0,
+                legend: {{
+                    position: 'bottom',
+                    labels: {{
+                        usePointStyle: true,
+                        padding: 16,
+                        font: {{ size: 12 }}
+                    }}
+                }},
+                annotation: {{
+                    annotations: {{
+                        premiumLine: {{
+                            type: 'line',
+                            yMin: cvData.total_premium,
+                            yMax: cvData.total_premium,
+                            borderColor: '#999',
+                            borderWidth: 1.5,
+                            borderDash: [6, 4],
+                            label: {{
+                                content: 'Total Premium $' + cvData.total_premium.toLocaleString(),
+                                display: true,
+                                position: 'start',
+                                font: {{ size: 10 }},
+                                color: '#666',
+                                backgroundColor: 'rgba(255,255,255,0.8)',
+                            }}
+                        }}
+                    }}
                 }}
             }},
-            y: {{
-                title: {{
-                    display: true,
-                    text: 'Cash Value ({currency_symbol})',
-                    font: {{ size: 13 }}
-                }},
-                ticks: {{
-                    callback: function(val) {{
-                        return '$' + val.toLocaleString();
+            scales: {{
+                x: {{
+                    title: {{
+                        display: true,
+                        text: 'Policy Year 保单年期',
+                        font: {{ size: 13 }}
+                    }},
+                    ticks: {{
+                        callback: function(val, idx) {{
+                            const label = cvData.labels[idx];
+                            return (label % 5 === 0) ? label : '';
+                        }},
+                        maxRotation: 0,
                     }}
                 }},
-                beginAtZero: true,
+                y: {{
+                    title: {{
+                        display: true,
+                        text: 'Cash Value ({currency_symbol})',
+                        font: {{ size: 13 }}
+                    }},
+                    ticks: {{
+                        callback: function(val) {{
+                            return '$' + val.toLocaleString();
+                        }}
+                    }},
+                    beginAtZero: true,
+                }}
             }}
         }}
-    }}
-}});
+    }});
 
-// IRR Chart
-const chartData = {chart_data_json};
-const hasWithdrawal = {has_withdrawal};
-
-const ctx = document.getElementById('irrChart').getContext('2d');
-const datasets = [
-    {{
-        label: '不提取 IRR (预期Total)',
-        data: chartData.nw_total,
-        borderColor: '{primary_color}',
-        backgroundColor: 'rgba(200, 16, 46, 0.05)',
-        borderWidth: 2.5,
-        fill: false,
-        tension: 0.3,
-        pointRadius: 0,
-        pointHitRadius: 10,
-        spanGaps: true,
-    }},
-];
-
-if (hasWithdrawal) {{
-    datasets.push(
+    // IRR Chart
+    const chartData = {chart_data_json};
+    const hasWithdrawal = {has_withdrawal};
+
+    const ctx = document.getElementById('irrChart').getContext('2d');
+    const datasets = [
         {{
-            label: '提取 IRR (预期Total)',
-            data: chartData.wd_total,
-            borderColor: '#1565C0',
+            label: '不提取 IRR (预期Total)',
+            data: chartData.nw_total,
+            borderColor: '{primary_color}',
+            backgroundColor: 'rgba(200, 16, 46, 0.05)',
             borderWidth: 2.5,
             fill: false,
             tension: 0.3,
             pointRadius: 0,
             pointHitRadius: 10,
             spanGaps: true,
-        }}
-    );
-}}
-
-new Chart(ctx, {{
-    type: 'line',
-    data: {{
-        labels: chartData.labels,
-        datasets: datasets,
-    }},
-    options: {{
-        responsive: true,
-        maintainAspectRatio: false,
-        interaction: {{
-            mode: 'index',
-            intersect: false,
         }},
-        plugins: {{
-            title: {{
-                display: false,
-            }},
-            tooltip: {{
-                callbacks: {{
-                    label: function(ctx) {{
-                        if (ctx.parsed.y === null) return null;
-                        return ctx.dataset.label + ': ' + ctx.parsed.y.toFixed(2) + '%';
-                    }}
-                }}
-            }},
-            legend: {{
-                position: 'bottom',
-                labels: {{
-                    usePointStyle: true,
-                    padding: 16,
-                    font: {{ size: 12 }}
-                }}
-            }},
-            annotation: {{
-                annotations: {{
-                    zeroline: {{
-                        type: 'line',
-                        yMin: 0,
-                        yMax: 0,
-                        borderColor: '#666',
-                        borderWidth: 1,
-                        borderDash: [4, 4],
-                        label: {{
-                            content: 'Break-even 0%',
-                            display: true,
-                            position: 'start',
-                            font: {{ size: 10 }},
-                            color: '#666',
-                            backgroundColor: 'rgba(255,255,255,0.8)',
-                        }}
-                    }}
-                }}
+    ];
+
+    if (hasWithdrawal) {{
+        datasets.push(
+            {{
+                label: '提取 IRR (预期Total)',
+                data: chartData.wd_total,
+                borderColor: '#1565C0',
+                borderWidth: 2.5,
+                fill: false,
+                tension: 0.3,
+                pointRadius: 0,
+                pointHitRadius: 10,
+                spanGaps: true,
             }}
+        );
+    }}
+
+    new Chart(ctx, {{
+        type: 'line',
+        data: {{
+            labels: chartData.labels,
+            datasets: datasets,
         }},
-        scales: {{
-            x: {{
+        options: {{
+            responsive: true,
+            maintainAspectRatio: false,
+            interaction: {{
+                mode: 'index',
+                intersect: false,
+            }},
+            plugins: {{
                 title: {{
-                    display: true,
-                    text: 'Policy Year 保单年期',
-                    font: {{ size: 13 }}
+                    display: false,
                 }},
-                ticks: {{
-                    callback: function(val, idx) {{
-                        const label = chartData.labels[idx];
-                        return (label % 5 === 0) ? label : '';
-                    }},
-                    maxRotation: 0,
+                tooltip: {{
+                    callbacks: {{
+                        label: function(ctx) {{
+                            if (ctx.parsed.y === null) return null;
+                            return ctx.dataset.label + ': ' + ctx.parsed.y.toFixed(2) + '%';
+                        }}
+                    }}
+                }},
+                legend: {{
+                    position: 'bottom',
+                    labels: {{
+                        usePointStyle: true,
+                        padding: 16,
+                        font: {{ size: 12 }}
+                    }}
+                }},
+                annotation: {{
+                    annotations: {{
+                        zeroline: {{
+                            type: 'line',
+                            yMin: 0,
+                            yMax: 0,
+                            borderColor: '#666',
+                            borderWidth: 1,
+                            borderDash: [4, 4],
+                            label: {{
+                                content: 'Break-even 0%',
+                                display: true,
+                                position: 'start',
+                                font: {{ size: 10 }},
+                                color: '#666',
+                                backgroundColor: 'rgba(255,255,255,0.8)',
+                            }}
+                        }}
+                    }}
                 }}
             }},
-            y: {{
-                title: {{
-                    display: true,
-                    text: 'IRR (%)',
-                    font: {{ size: 13 }}
-                }},
-                ticks: {{
-                    callback: function(val) {{
-                        return val.toFixed(1) + '%';
+            scales: {{
+                x: {{
+                    title: {{
+                        display: true,
+                        text: 'Policy Year 保单年期',
+                        font: {{ size: 13 }}
+                    }},
+                    ticks: {{
+                        callback: function(val, idx) {{
+                            const label = chartData.labels[idx];
+                            return (label % 5 === 0) ? label : '';
+                        }},
+                        maxRotation: 0,
                     }}
                 }},
-                suggestedMin: -20,
-                suggestedMax: 8,
+                y: {{
+                    title: {{
+                        display: true,
+                        text: 'IRR (%)',
+                        font: {{ size: 13 }}
+                    }},
+                    ticks: {{
+                        callback: function(val) {{
+                            return val.toFixed(1) + '%';
+                        }}
+                    }},
+                    suggestedMin: -20,
+                    suggestedMax: 8,
+                }}
             }}
         }}
-    }}
+    }});
 }});
 
 // Tab switching
@@ -871,3 +1051,60 @@ function toggleSection(id) {{
 </body>
 </html>
 """
+
+
+def _minify_template(template):
+    """Drop indentation, blank lines and whole-line CSS/JS comments.
+
+    Works line by line and keeps every newline that separates content, so
+    JS statement boundaries and inline HTML spacing are unaffected.
+    """
+    lines = []
+    for line in template.split('\n'):
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        if line.startswith('/*') and line.endswith('*/'):
+            continue
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+# Minify once at import, then split the result into (literal_text,
+# field_name) chunks; rendering is then a single join instead of a full
+# str.format parse.
+_HTML_TEMPLATE_MIN = _minify_template(_HTML_TEMPLATE)
+
+# Cached reports are only reused while the template and logo are unchanged
+_TEMPLATE_DIGEST = hashlib.blake2b((_HTML_TEMPLATE_MIN + _LOGO_SRC).encode('utf-8')).digest()
+
+# Literals are stored UTF-8 encoded so only the substituted values need
+# encoding per render.
+_TEMPLATE_CHUNKS = [
+    (literal_text.encode('utf-8'), field_name)
+    for literal_text, field_name, _spec, _conversion in string.Formatter().parse(_HTML_TEMPLATE_MIN)
+]
+
+
+def _write_template(f, values):
+    """Stream _HTML_TEMPLATE into binary file f as UTF-8, chunk by chunk.
+
+    A value may be a string, a scalar, or a list of table rows;
+    rows are written one at a time separated by newlines, which matches
+    the old '\n'.join(rows) output without building the joined string.
+    """
+    write = f.write
+    for literal_bytes, field_name in _TEMPLATE_CHUNKS:
+        write(literal_bytes)
+        if field_name is None:
+            continue
+        value = values[field_name]
+        if isinstance(value, str):
+            write(value.encode('utf-8'))
+        elif isinstance(value, list):
+            for j, row in enumerate(value):
+                if j:
+                    write(b'\n')
+                write(row.encode('utf-8'))
+        else:
+            write(str(value).encode('utf-8'))
@@ -1,12 +1,20 @@
 """
 IRR (Internal Rate of Return) calculation engine.
 
-Uses bisection method - no scipy/numpy dependencies needed.
+Uses Brent's method (bisection safeguarded by interpolation steps) -
+no scipy/numpy dependencies needed.
 Supports two scenarios: no-withdrawal and with-withdrawal.
 """
+import bisect
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import math
+import sys
 from typing import List, Optional, Tuple, Dict
 from .config import PolicyConfig
 
+_EPS = sys.float_info.epsilon
+
 
 def npv(rate: float, cashflows: List[float], times: List[float]) -> float:
     """Calculate Net Present Value at a given discount rate.
@@ -15,10 +23,65 @@ def npv(rate: float, cashflows: List[float], times: List[float]) -> float:
     """
     if rate <= -1.0:
         return float('inf')
-    total = 0.0
-    for cf, t in zip(cashflows, times):
-        total += cf / ((1 + rate) ** t)
-    return total
+    base = 1.0 + rate
+    # fsum keeps the large premium and surrender terms from losing
+    # precision against each other
+    return math.fsum([cf / base ** t for cf, t in zip(cashflows, times)])
+
+
+def _npv_function(cashflows: List[float], times: List[float]):
+    """Return f(rate) -> NPV, choosing the cheaper evaluation for the solver.
+
+    With integer times NPV is a polynomial in v = 1/(1+rate), so dense
+    cash flows (withdrawals most years) are evaluated by Horner's rule:
+    one multiply-add per year instead of one pow per cash flow. Sparse
+    flows that start with a level premium block (every no-withdrawal
+    scenario) value the block as an annuity in closed form, so both
+    surrender variants cost O(1) for the premiums. Anything else stays
+    on npv().
+    """
+    if all(isinstance(t, int) and t >= 0 for t in times):
+        n_coeffs = max(times) + 1
+        if n_coeffs <= 2 * len(cashflows):
+            coeffs = [0.0] * n_coeffs
+            for cf, t in zip(cashflows, times):
+                coeffs[t] += cf
+            coeffs.reverse()
+
+            def horner(rate):
+                if rate <= -1.0:
+                    return float('inf')
+                v = 1.0 / (1.0 + rate)
+                acc = 0.0
+                for c in coeffs:
+                    acc = acc * v + c
+                return acc
+            return horner
+
+        # Length of the leading level premium block paid at t = 0, 1, ...
+        premium = cashflows[0]
+        n_premiums = 0
+        for cf, t in zip(cashflows, times):
+            if t != n_premiums or cf != premium:
+                break
+            n_premiums += 1
+        if n_premiums >= 2:
+            rest_cf = cashflows[n_premiums:]
+            rest_t = times[n_premiums:]
+
+            def annuity(rate):
+                if rate <= -1.0:
+                    return float('inf')
+                # sum((1+rate)**-t for t < n); expm1/log1p keep it accurate
+                # for rates near zero
+                if rate == 0.0:
+                    factor = float(n_premiums)
+                else:
+                    factor = -(1.0 + rate) * math.expm1(-n_premiums * math.log1p(rate)) / rate
+                return premium * factor + npv(rate, rest_cf, rest_t)
+            return annuity
+
+    return lambda rate: npv(rate, cashflows, times)
 
 
 def calculate_irr(
@@ -28,8 +91,9 @@ def calculate_irr(
     hi: float = 5.0,
     tol: float = 1e-10,
     max_iter: int = 2000,
+    guess: Optional[float] = None,
 ) -> Optional[float]:
-    """Calculate IRR using bisection method.
+    """Calculate IRR using Brent's method on a sign-changing bracket.
 
     Returns None if no solution found (e.g., all cashflows are negative).
 
@@ -38,8 +102,11 @@ def calculate_irr(
         times: Corresponding time points for each cash flow
         lo: Lower bound for rate search (default -0.99 = -99%)
         hi: Upper bound for rate search (default 5.0 = 500%)
-        tol: Convergence tolerance
+        tol: Convergence tolerance, on the rate and on NPV relative to the
+            total size of the cash flows (sum of absolute values)
         max_iter: Maximum iterations
+        guess: Expected IRR (e.g. the previous year's); if given, a narrow
+            bracket around it is tried before the default [lo, hi] search
 
     Returns:
         IRR as a decimal (e.g., 0.05 = 5%), or None if no solution
@@ -52,15 +119,25 @@ def calculate_irr(
     if all(cf >= 0 for cf in cashflows):
         return None
 
+    f = _npv_function(cashflows, times)
+    # NPV is in currency units, so scale its tolerance by the cash flows
+    ftol = tol * math.fsum(abs(cf) for cf in cashflows)
+
+    # Warm start: a bracket a few percent wide converges in fewer steps
+    if guess is not None:
+        bracket = _bracket_around(f, guess, lo)
+        if bracket is not None:
+            return _brent(f, *bracket, tol, ftol, max_iter)
+
     # Evaluate NPV at boundaries
-    npv_lo = npv(lo, cashflows, times)
-    npv_hi = npv(hi, cashflows, times)
+    npv_lo = f(lo)
+    npv_hi = f(hi)
 
     # If NPV at both ends has the same sign, try to expand the bracket
     if npv_lo * npv_hi > 0:
         # Try expanding hi
         for test_hi in [10.0, 50.0, 100.0]:
-            npv_test = npv(test_hi, cashflows, times)
+            npv_test = f(test_hi)
             if npv_lo * npv_test < 0:
                 hi = test_hi
                 npv_hi = npv_test
@@ -68,7 +145,7 @@ def calculate_irr(
         else:
             # Try with a smaller lo
             for test_lo in [-0.999, -0.9999]:
-                npv_test = npv(test_lo, cashflows, times)
+                npv_test = f(test_lo)
                 if npv_test * npv_hi < 0:
                     lo = test_lo
                     npv_lo = npv_test
@@ -76,25 +153,100 @@ def calculate_irr(
             else:
                 return None
 
-    # Bisection
-    for _ in range(max_iter):
-        mid = (lo + hi) / 2.0
-        npv_mid = npv(mid, cashflows, times)
+    return _brent(f, lo, hi, npv_lo, npv_hi, tol, ftol, max_iter)
 
-        if abs(npv_mid) < tol:
-            return mid
 
-        if npv_lo * npv_mid < 0:
-            hi = mid
-            npv_hi = npv_mid
+def _bracket_around(f, guess: float, lo: float) -> Optional[Tuple[float, float, float, float]]:
+    """Find a sign-changing bracket (a, b, f(a), f(b)) around guess.
+
+    Tries half-widths of 2%, 20% and 200%, never going below lo.
+    Returns None if none of them brackets a root.
+    """
+    for delta in (0.02, 0.2, 2.0):
+        a = max(lo, guess - delta)
+        b = guess + delta
+        fa = f(a)
+        fb = f(b)
+        if (fa > 0) != (fb > 0):
+            return a, b, fa, fb
+    return None
+
+
+def _brent(f, a: float, b: float, fa: float, fb: float,
+           tol: float, ftol: float, max_iter: int) -> float:
+    """Find a root of f in the bracket [a, b] with Brent's method.
+
+    fa and fb are f(a) and f(b) and must differ in sign. Each step takes
+    an inverse quadratic or secant step when it stays well inside the
+    bracket and falls back to bisection otherwise, so convergence is
+    never slower than bisection but usually superlinear.
+    Stops when |f| < ftol or the bracket is narrower than about tol.
+    """
+    c, fc = b, fb
+    d = e = b - a
+    for _ in range(max_iter):
+        # Keep the root between b and c
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        # b is the best estimate so far
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+
+        tol1 = 2.0 * _EPS * abs(b) + 0.5 * tol
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol1 or abs(fb) < ftol:
+            return b
+
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Secant step
+                p = 2.0 * xm * s
+                q = 1.0 - s
+            else:
+                # Inverse quadratic interpolation
+                q = fa / fc
+                r = fb / fc
+                p = s * (2.0 * xm * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2.0 * p < min(3.0 * xm * q - abs(tol1 * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = xm
         else:
-            lo = mid
-            npv_lo = npv_mid
+            d = e = xm
+
+        a, fa = b, fb
+        b += d if abs(d) > tol1 else math.copysign(tol1, xm)
+        fb = f(b)
+
+    return b
+
 
-        if abs(hi - lo) < tol:
-            return (lo + hi) / 2.0
+@functools.lru_cache(maxsize=512)
+def _calculate_irr_cached(cashflows: tuple, times: tuple,
+                          guess: Optional[float] = None) -> Optional[float]:
+    """calculate_irr memoized on the cash flow signature.
 
-    return (lo + hi) / 2.0
+    Scenarios often repeat exactly, e.g. guaranteed and total values are
+    equal in early years, so identical cash flows are solved only once.
+    """
+    return calculate_irr(cashflows, times, guess=guess)
+
+
+@functools.lru_cache(maxsize=128)
+def _premium_prefix(n_premiums: int, annual_premium: float) -> Tuple[tuple, tuple]:
+    """Premium cash flows and times shared by every scenario with n_premiums.
+
+    Only payment_years + 1 distinct prefixes exist per policy, so each is
+    built once and copied into the per-year cash flow lists.
+    """
+    return (-annual_premium,) * n_premiums, tuple(range(n_premiums))
 
 
 def build_cashflows_no_withdrawal(
@@ -109,18 +261,29 @@ def build_cashflows_no_withdrawal(
     - Premium paid at t=0, 1, ..., min(year, payment_years)-1
     - Surrender value received at t=year
     """
-    n_premiums = min(year, payment_years)
-    cashflows = [-annual_premium] * n_premiums + [surrender_value]
-    times = list(range(n_premiums)) + [year]
+    prefix_cf, prefix_t = _premium_prefix(min(year, payment_years), annual_premium)
+    cashflows = [*prefix_cf, surrender_value]
+    times = [*prefix_t, year]
     return cashflows, times
 
 
+def _positive_withdrawals(withdrawal_data: list) -> Tuple[List[int], List[float]]:
+    """Years (sorted) and amounts of all withdrawals with amount > 0."""
+    amount_by_year = {}
+    for wd in withdrawal_data:
+        if wd.withdrawal_amount > 0:
+            amount_by_year[wd.year] = wd.withdrawal_amount
+    years = sorted(amount_by_year)
+    return years, [amount_by_year[y] for y in years]
+
+
 def build_cashflows_with_withdrawal(
     year: int,
     annual_premium: float,
     payment_years: int,
     withdrawal_data: list,
     remaining_surrender: float,
+    positive_withdrawals: Optional[Tuple[List[int], List[float]]] = None,
 ) -> Tuple[List[float], List[float]]:
     """Build cash flow vector for withdrawal scenario IRR at a given year.
 
@@ -131,25 +294,27 @@ def build_cashflows_with_withdrawal(
 
     The withdrawal_data list provides each year's withdrawal amount.
     No hardcoded start year or amount - fully data-driven.
+    Callers building many years can pass positive_withdrawals, the result
+    of _positive_withdrawals(withdrawal_data), to avoid recomputing it.
     """
-    n_premiums = min(year, payment_years)
-    cashflows = [-annual_premium] * n_premiums
-    times = list(range(n_premiums))
+    prefix_cf, prefix_t = _premium_prefix(min(year, payment_years), annual_premium)
+    cashflows = list(prefix_cf)
+    times = list(prefix_t)
 
-    # Build a dict: year -> withdrawal_amount
-    withdrawal_by_year = {}
-    for wd in withdrawal_data:
-        if wd.year <= year and wd.withdrawal_amount > 0:
-            withdrawal_by_year[wd.year] = wd.withdrawal_amount
+    if positive_withdrawals is None:
+        positive_withdrawals = _positive_withdrawals(withdrawal_data)
+    wd_years, wd_amounts = positive_withdrawals
 
     # Add past withdrawal cash flows (years before the current year)
-    for wd_year in sorted(withdrawal_by_year.keys()):
-        if wd_year < year:
-            cashflows.append(withdrawal_by_year[wd_year])
-            times.append(wd_year)
+    n_past = bisect.bisect_left(wd_years, year)
+    cashflows += wd_amounts[:n_past]
+    times += wd_years[:n_past]
 
     # Final year: withdrawal + remaining surrender
-    final_withdrawal = withdrawal_by_year.get(year, 0)
+    if n_past < len(wd_years) and wd_years[n_past] == year:
+        final_withdrawal = wd_amounts[n_past]
+    else:
+        final_withdrawal = 0
     final_cashflow = final_withdrawal + remaining_surrender
     cashflows.append(final_cashflow)
     times.append(year)
@@ -177,6 +342,11 @@ def calculate_all_irr(config: PolicyConfig) -> List[Dict]:
     withdrawal_by_year = {}
     for wd in config.withdrawal_data:
         withdrawal_by_year[wd.year] = wd
+    positive_withdrawals = _positive_withdrawals(config.withdrawal_data)
+
+    # IRR moves smoothly from year to year, so each scenario's previous
+    # result is used as the starting guess for the next year
+    prev = {}
 
     for rec in config.yearly_data:
         year = rec.year
@@ -188,14 +358,16 @@ def calculate_all_irr(config: PolicyConfig) -> List[Dict]:
             year, pi.annual_premium, pi.payment_years,
             rec.guaranteed_cash_value
         )
-        irr_nw_g = calculate_irr(cf_g, t_g)
+        irr_nw_g = _calculate_irr_cached(
+            tuple(cf_g), tuple(t_g), prev.get('irr_no_withdrawal_guaranteed'))
 
         # Total (expected)
         cf_t, t_t = build_cashflows_no_withdrawal(
             year, pi.annual_premium, pi.payment_years,
             rec.total_surrender_value
         )
-        irr_nw_t = calculate_irr(cf_t, t_t)
+        irr_nw_t = _calculate_irr_cached(
+            tuple(cf_t), tuple(t_t), prev.get('irr_no_withdrawal_total'))
 
         # --- Scenario B: With Withdrawal ---
         irr_wd_g = None
@@ -209,24 +381,43 @@ def calculate_all_irr(config: PolicyConfig) -> List[Dict]:
                 year, pi.annual_premium, pi.payment_years,
                 config.withdrawal_data,
                 wd_rec.remaining_surrender_guaranteed,
+                positive_withdrawals,
             )
-            irr_wd_g = calculate_irr(cf_wg, t_wg)
+            irr_wd_g = _calculate_irr_cached(
+                tuple(cf_wg), tuple(t_wg), prev.get('irr_withdrawal_guaranteed'))
 
             # Total (expected)
             cf_wt, t_wt = build_cashflows_with_withdrawal(
                 year, pi.annual_premium, pi.payment_years,
                 config.withdrawal_data,
                 wd_rec.remaining_surrender_total,
+                positive_withdrawals,
             )
-            irr_wd_t = calculate_irr(cf_wt, t_wt)
+            irr_wd_t = _calculate_irr_cached(
+                tuple(cf_wt), tuple(t_wt), prev.get('irr_withdrawal_total'))
 
-        results.append({
+        prev = {
             'year': year,
             'age': age,
             'irr_no_withdrawal_guaranteed': irr_nw_g,
             'irr_no_withdrawal_total': irr_nw_t,
             'irr_withdrawal_guaranteed': irr_wd_g,
             'irr_withdrawal_total': irr_wd_t,
-        })
+        }
+        results.append(prev)
 
     return results
+
+
+def calculate_all_irr_batch(configs: List[PolicyConfig],
+                            max_workers: Optional[int] = None) -> List[List[Dict]]:
+    """Run calculate_all_irr for many policies, one process per core.
+
+    Results are returned in the same order as configs. A single policy is
+    calculated in-process, since starting workers would cost more than it
+    saves.
+    """
+    if len(configs) <= 1:
+        return [calculate_all_irr(config) for config in configs]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(calculate_all_irr, configs))
@@ -3,14 +3,14 @@ Insurance Policy IRR Calculator - CLI Entry Point
 
 Usage:
     python -m src.main policy_data/aia_visionlife_5pay.json -o output/
+    python -m src.main policy_data/ -o output/    # every policy in a directory
 """
 import argparse
 import sys
 from pathlib import Path
 
 from .config import load_policy
-from .irr import calculate_all_irr
-from .excel_writer import create_excel_report
+from .irr import calculate_all_irr, calculate_all_irr_batch
 from .html_writer import create_html_report
 
 
@@ -24,11 +24,12 @@ Examples:
   python -m src.main policy_data/aia_visionlife_5pay.json -o output/
   python -m src.main policy_data/aia_visionlife_5pay.json --excel-only
   python -m src.main policy_data/aia_visionlife_5pay.json --html-only
+  python -m src.main policy_data/ -o output/
         """,
     )
     parser.add_argument(
         "policy_json",
-        help="Path to policy JSON configuration file (保单数据JSON文件路径)",
+        help="Path to policy JSON configuration file, or a directory of them (保单数据JSON文件路径)",
     )
     parser.add_argument(
         "-o", "--output-dir",
@@ -45,9 +46,17 @@ Examples:
         action="store_true",
         help="Generate HTML output only",
     )
+    parser.add_argument(
+        "--cache-dir",
+        help="Reuse HTML reports rendered from identical inputs (cache directory)",
+    )
 
     args = parser.parse_args()
 
+    if Path(args.policy_json).is_dir():
+        _main_batch(args)
+        return
+
     # 1. Load config
     print(f"Loading policy data from: {args.policy_json}")
     config = load_policy(args.policy_json)
@@ -61,33 +70,68 @@ Examples:
     irr_results = calculate_all_irr(config)
     print(f"  Calculated IRR for {len(irr_results)} years")
 
-    # Print a few key IRR values
+    # Print a few key IRR values (collected and written in one call)
+    lines = []
     for r in irr_results:
-        if r['year'] in [5, 10, 15, 20, 30]:
+        if r['year'] in (5, 10, 15, 20, 30):
             nw = r['irr_no_withdrawal_total']
             wd = r['irr_withdrawal_total']
             nw_str = f"{nw*100:.2f}%" if nw is not None else "N/A"
             wd_str = f"{wd*100:.2f}%" if wd is not None else "N/A"
-            print(f"  Year {r['year']:>3d} (Age {r['age']:>3d}): No-withdrawal={nw_str:>10s}  Withdrawal={wd_str:>10s}")
+            lines.append(f"  Year {r['year']:>3d} (Age {r['age']:>3d}): No-withdrawal={nw_str:>10s}  Withdrawal={wd_str:>10s}\n")
+    sys.stdout.write(''.join(lines))
 
     # 3. Generate outputs
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    slug = config.policy_info.insurer.lower().replace(' ', '_')
+    _write_reports(config, irr_results, output_dir, config.policy_info.slug, args)
+
+    print("\nDone!")
+
+
+def _main_batch(args):
+    """Process every policy JSON in a directory, calculating IRR in parallel.
+
+    Reports are named after each JSON file, since several policies can
+    share an insurer.
+    """
+    policy_paths = sorted(Path(args.policy_json).glob("*.json"))
+    if not policy_paths:
+        print(f"No policy JSON files found in: {args.policy_json}")
+        sys.exit(1)
+
+    configs = []
+    for path in policy_paths:
+        print(f"Loading policy data from: {path}")
+        configs.append(load_policy(str(path)))
+
+    print(f"\nCalculating IRR for {len(configs)} policies...")
+    all_results = calculate_all_irr_batch(configs)
 
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for path, config, irr_results in zip(policy_paths, configs, all_results):
+        _write_reports(config, irr_results, output_dir, path.stem, args)
+
+    print("\nDone!")
+
+
+def _write_reports(config, irr_results, output_dir, name, args):
+    """Write the Excel and/or HTML report as <name>_irr_report.*"""
     if not args.html_only:
-        excel_path = output_dir / f"{slug}_irr_report.xlsx"
+        # Imported here so --html-only runs skip loading openpyxl
+        from .excel_writer import create_excel_report
+        excel_path = output_dir / f"{name}_irr_report.xlsx"
         create_excel_report(config, irr_results, str(excel_path))
         print(f"\n✅ Excel report: {excel_path}")
 
     if not args.excel_only:
-        html_path = output_dir / f"{slug}_irr_report.html"
-        create_html_report(config, irr_results, str(html_path))
+        html_path = output_dir / f"{name}_irr_report.html"
+        create_html_report(config, irr_results, str(html_path), cache_dir=args.cache_dir)
         print(f"✅ HTML report:  {html_path}")
 
-    print("\nDone!")
-
 
 if __name__ == "__main__":
     main()
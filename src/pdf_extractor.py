@@ -4,29 +4,66 @@ PDF extraction engine for AIA insurance policy illustrations.
 Handles CID-encoded fonts common in AIA policy PDFs by decoding
 CID numbers to ASCII characters (CID + 29 = ASCII).
 """
+import functools
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
 from typing import Optional
 
 import pdfplumber
 
 
+_CID_RE = re.compile(r'\(cid:(\d+)\)')
+# Printable ASCII (32..126) keyed by the full CID token, e.g. '(cid:36)' -> 'A'
+_CID_MAP = {f'(cid:{code - 29})': chr(code) for code in range(32, 127)}
+_NUM_STRIP_RE = re.compile(r'[^\d.\-]')
+_NUM_SEPARATORS = str.maketrans('', '', ', $\t\u3000')
+_NUMERIC_BLANKS = frozenset(('-', '—', 'N/A', '不适用', ''))
+_WS_RE = re.compile(r'\s+')
+_NAME_RE = re.compile(r'受保人姓名[:：]\s*([^\n]+?)(?:\s+年龄[:：]|\s+性别[:：]|$)')
+_AGE_RE = re.compile(r'年龄[:：]\s*(\d{1,3})')
+_GENDER_RE = re.compile(r'性别[:：]\s*([男女MF])')
+_SMALL_INT_RE = re.compile(r'\d{1,2}')
+# Legacy column labels such as '(A)' or '(F ' -> 'A)', 'F '
+_LABEL_RE = re.compile(r'\(([A-Z0-9][) ])')
+
+# Product and currency markers in page-1 text; the group order is the
+# precedence when a page mentions several
+_PRODUCT_RE = re.compile(r'(环宇盈活|環宇盈活)|(活享储蓄|活享儲蓄)|(爱伴航|愛伴航)')
+_PRODUCTS = (
+    ('环宇盈活储蓄保险计划', 'AIA Vision Life Savings Plan'),
+    ('活享储蓄保险计划', 'AIA Flexi Savings Plan'),
+    ('爱伴航保险计划', 'AIA Love Navigator Plan'),
+)
+_CURRENCY_RE = re.compile(r'(USD|美元)|(HKD|港元|港幣)|(RMB|CNY|人民币)')
+_CURRENCIES = (('USD', '$'), ('HKD', 'HK$'), ('RMB', '¥'))
+
+# Header labels that must all appear in the Chinese table formats
+_NW_CN_KEYWORDS = ('年龄', '保单年度终结', '缴付保费总额', '退保发还金额', '身故赔偿额')
+_WD_CN_KEYWORDS = ('年龄', '保单年度终结', '现金提取金额', '现金提取后之退保发还金额')
+
+
 # ---------------------------------------------------------------------------
 # CID Decoding
 # ---------------------------------------------------------------------------
 
+def _replace_cid(m) -> str:
+    char = _CID_MAP.get(m.group(0))
+    if char is not None:
+        return char
+    ascii_code = int(m.group(1)) + 29
+    return chr(ascii_code) if 32 <= ascii_code <= 126 else ''
+
+
+@functools.lru_cache(maxsize=8192)
 def decode_cid(text: str) -> str:
     """Decode CID-encoded text. AIA PDFs use CID + 29 = ASCII mapping."""
     if not text:
         return ''
-
-    def _replace(m):
-        cid = int(m.group(1))
-        ascii_code = cid + 29
-        if 32 <= ascii_code <= 126:
-            return chr(ascii_code)
-        return ''
-
-    return re.sub(r'\(cid:(\d+)\)', _replace, text)
+    if '(cid:' not in text:
+        return text
+    return _CID_RE.sub(_replace_cid, text)
 
 
 def clean_numeric(text: str) -> float:
@@ -34,22 +71,36 @@ def clean_numeric(text: str) -> float:
     if not text:
         return 0.0
     text = text.strip()
-    if text in ('-', '—', 'N/A', '不适用', ''):
+    if text in _NUMERIC_BLANKS:
         return 0.0
-    cleaned = text.replace(',', '').replace('$', '').replace('HK$', '')
-    cleaned = re.sub(r'[^\d.\-]', '', cleaned)
+    cleaned = text.translate(_NUM_SEPARATORS)
+    # Fast path for plain amounts such as '123,456' or '-1,234.56'
+    digits = cleaned[1:] if cleaned[:1] == '-' else cleaned
+    if digits.replace('.', '', 1).isdecimal():
+        return float(cleaned)
+    cleaned = _NUM_STRIP_RE.sub('', cleaned)
     if not cleaned or cleaned == '-':
         return 0.0
     return float(cleaned)
 
 
+def _first_marker(pattern: re.Pattern, text: str) -> Optional[int]:
+    """Index of the first alternative group of pattern found anywhere in text."""
+    groups = {m.lastindex for m in pattern.finditer(text)}
+    return min(groups) - 1 if groups else None
+
+
 # ---------------------------------------------------------------------------
 # Table detection helpers
 # ---------------------------------------------------------------------------
 
-def _identify_table_type(header_rows: list, ncols: int) -> Optional[str]:
+@functools.lru_cache(maxsize=64)
+def _identify_table_type(header_rows: tuple, ncols: int) -> Optional[str]:
     """Identify table type from decoded header labels and column count.
 
+    header_rows is a tuple of row tuples so that the repeated header of a
+    table continued over several pages is classified only once.
+
     Returns:
         'no_withdrawal_cn' — Chinese 12-col combined surrender + death table
         'withdrawal_cn'    — Chinese 9-col withdrawal-after-surrender table
@@ -61,38 +112,30 @@ def _identify_table_type(header_rows: list, ncols: int) -> Optional[str]:
     flat = ' '.join(
         decode_cid(str(cell)) for row in header_rows for cell in row if cell
     )
-    flat_norm = re.sub(r'\s+', '', flat)
+    flat_norm = _WS_RE.sub('', flat)
 
     # Newer Chinese table formats
     if (
         ncols >= 11
         and '现金提取后' not in flat_norm
-        and all(
-            kw in flat_norm
-            for kw in ['年龄', '保单年度终结', '缴付保费总额', '退保发还金额', '身故赔偿额']
-        )
+        and all(kw in flat_norm for kw in _NW_CN_KEYWORDS)
     ):
         return 'no_withdrawal_cn'
 
-    if (
-        ncols >= 9
-        and all(
-            kw in flat_norm
-            for kw in ['年龄', '保单年度终结', '现金提取金额', '现金提取后之退保发还金额']
-        )
-    ):
+    if ncols >= 9 and all(kw in flat_norm for kw in _WD_CN_KEYWORDS):
         return 'withdrawal_cn'
 
     # Legacy formats
-    if ncols == 8 and ('(A)' in flat and '(E)' in flat):
+    if ncols not in (8, 10):
+        return None
+    labels = set(_LABEL_RE.findall(flat))
+    if ncols == 8 and 'A)' in labels and ('E)' in labels or 'B)' in labels):
         return 'no_withdrawal'
-    if ncols == 8 and ('(A)' in flat and '(B)' in flat):
-        return 'no_withdrawal'
-    if ncols == 10 and ('(F)' in flat or '(F ' in flat):
+    if ncols == 10 and ('F)' in labels or 'F ' in labels):
         return 'death_benefit'
-    if ncols == 10 and ('(1)' in flat and '(2)' in flat):
+    if ncols == 10 and ('1)' in labels and '2)' in labels):
         return 'withdrawal'
-    if ncols == 10 and '(G)' in flat:
+    if ncols == 10 and 'G)' in labels:
         return 'death_benefit'
 
     return None
@@ -108,29 +151,49 @@ def _expand_rows(table: list, header_rows: int = 3) -> list[list[str]]:
     data_rows = table[header_rows:]
     expanded = []
     for row in data_rows:
-        decoded = [decode_cid(str(c)).strip() if c else '' for c in row]
-        split_cells = [cell.split('\n') for cell in decoded]
-        n_sub = max(len(parts) for parts in split_cells) if split_cells else 0
-        for j in range(n_sub):
-            sub_row = []
-            for parts in split_cells:
-                if j < len(parts):
-                    sub_row.append(parts[j].strip())
-                else:
-                    sub_row.append('')
-            expanded.append(sub_row)
+        split_cells = [decode_cid(str(c)).strip().split('\n') if c else [''] for c in row]
+        for sub_row in zip_longest(*split_cells, fillvalue=''):
+            expanded.append([part.strip() for part in sub_row])
     return expanded
 
 
+def _page_tables(page, flush: bool = True) -> list:
+    """Extract the raw tables of one pdfplumber page."""
+    # Tables are found from ruling edges; a page without any drawn
+    # lines, rects or curves (cover notes, footnotes) cannot hold one.
+    if page.rects or page.lines or page.curves:
+        tables = page.extract_tables()
+    else:
+        tables = []
+    # Drop the parsed layout objects as soon as the tables are out.
+    if flush:
+        page.flush_cache()
+    return tables
+
+
+def _extract_page_tables(pdf_path: str, page_indices: list[int]) -> list[list]:
+    """Worker entry point: raw tables for a contiguous run of pages."""
+    with pdfplumber.open(pdf_path, pages=[i + 1 for i in page_indices]) as pdf:
+        return [_page_tables(page) for page in pdf.pages]
+
+
 # ---------------------------------------------------------------------------
 # Main Extractor
 # ---------------------------------------------------------------------------
 
+# Below this many pages, worker start-up and the per-worker reopen of the
+# PDF cost more than parsing the pages in-process.
+_PARALLEL_MIN_PAGES = 8
+
+
 class AIAPDFExtractor:
     """Extract insurance policy data from AIA PDF illustrations."""
 
-    def __init__(self, pdf_path: str):
+    __slots__ = ('pdf_path', 'max_workers', 'warnings', '_pdf')
+
+    def __init__(self, pdf_path: str, max_workers: Optional[int] = None):
         self.pdf_path = pdf_path
+        self.max_workers = max_workers
         self.warnings: list[str] = []
         self._pdf = None
 
@@ -154,8 +217,7 @@ class AIAPDFExtractor:
         wd_tables = []       # [(table_type, table)]
         policy_tables = []   # small tables on page 1 (policy info)
 
-        for page_idx, page in enumerate(self._pdf.pages):
-            tables = page.extract_tables()
+        for page_idx, tables in enumerate(self._iter_page_tables()):
             for table in tables:
                 if not table or len(table) < 2:
                     continue
@@ -167,7 +229,7 @@ class AIAPDFExtractor:
                     policy_tables.append(table)
                     continue
 
-                header_rows = table[:min(3, nrows)]
+                header_rows = tuple(tuple(row) for row in table[:3])
                 ttype = _identify_table_type(header_rows, ncols)
 
                 if ttype in ('no_withdrawal', 'no_withdrawal_cn'):
@@ -247,6 +309,29 @@ class AIAPDFExtractor:
 
         return result
 
+    def _iter_page_tables(self):
+        """Yield the raw tables of every page, in page order.
+
+        Long illustrations are split into contiguous page runs parsed by
+        a process pool; pdfplumber is pure Python, so pages only parse
+        concurrently in separate processes.
+        """
+        pages = self._pdf.pages
+        n_pages = len(pages)
+        workers = min(self.max_workers or os.cpu_count() or 1, n_pages)
+        if n_pages < _PARALLEL_MIN_PAGES or workers <= 1:
+            for page_idx, page in enumerate(pages):
+                # Page 1 text is read again for policy info; keep its layout.
+                yield _page_tables(page, flush=page_idx > 0)
+            return
+
+        step = -(-n_pages // workers)
+        chunks = [list(range(i, min(i + step, n_pages))) for i in range(0, n_pages, step)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+            for chunk_tables in executor.map(_extract_page_tables,
+                                             [self.pdf_path] * len(chunks), chunks):
+                yield from chunk_tables
+
     # ------------------------------------------------------------------
     # Policy info extraction
     # ------------------------------------------------------------------
@@ -281,58 +366,58 @@ class AIAPDFExtractor:
         page1_text = self._pdf.pages[0].extract_text() or ''
         page1_decoded = decode_cid(page1_text)
 
+        # Only the first two rows of each page-1 table are read below;
+        # decode them once for both the identity and premium lookups.
+        decoded_tables = [
+            [[decode_cid(str(c)).strip() if c else '' for c in row] for row in table[:2]]
+            for table in policy_tables
+        ]
+
         # 1) Identity fields from first small table + text labels
-        if policy_tables and policy_tables[0]:
-            first_row = [decode_cid(str(c)).strip() if c else '' for c in policy_tables[0][0]]
+        if decoded_tables and decoded_tables[0]:
+            first_row = decoded_tables[0][0]
             first_row_text = ' '.join(c for c in first_row if c)
 
-            name_match = re.search(
-                r'受保人姓名[:：]\s*([^\n]+?)(?:\s+年龄[:：]|\s+性别[:：]|$)',
-                first_row_text,
-            )
+            name_match = _NAME_RE.search(first_row_text)
             if name_match:
                 info['insured_name'] = name_match.group(1).strip(' -')
 
-            age_match = re.search(r'年龄[:：]\s*(\d{1,3})', first_row_text)
+            age_match = _AGE_RE.search(first_row_text)
             if age_match:
                 age = int(age_match.group(1))
                 if 0 <= age <= 120:
                     info['age_at_issue'] = age
 
-            gender_match = re.search(r'性别[:：]\s*([男女MF])', first_row_text)
+            gender_match = _GENDER_RE.search(first_row_text)
             if gender_match:
                 g = gender_match.group(1)
                 info['gender'] = 'M' if g in ('男', 'M') else 'F'
 
         if not info['insured_name']:
-            name_match = re.search(
-                r'受保人姓名[:：]\s*([^\n]+?)(?:\s+年龄[:：]|\s+性别[:：]|$)',
-                page1_decoded,
-            )
+            name_match = _NAME_RE.search(page1_decoded)
             if name_match:
                 info['insured_name'] = name_match.group(1).strip(' -')
 
         if info['age_at_issue'] == 0:
-            age_match = re.search(r'年龄[:：]\s*(\d{1,3})', page1_decoded)
+            age_match = _AGE_RE.search(page1_decoded)
             if age_match:
                 age = int(age_match.group(1))
                 if 0 <= age <= 120:
                     info['age_at_issue'] = age
 
         if info['gender'] not in ('M', 'F'):
-            gender_match = re.search(r'性别[:：]\s*([男女MF])', page1_decoded)
+            gender_match = _GENDER_RE.search(page1_decoded)
             if gender_match:
                 g = gender_match.group(1)
                 info['gender'] = 'M' if g in ('男', 'M') else 'F'
 
         # 2) Annual premium + payment years from policy summary table by header labels
-        for table in policy_tables:
-            if len(table) < 2:
+        for rows in decoded_tables:
+            if len(rows) < 2:
                 continue
 
-            header = [decode_cid(str(c)).strip() if c else '' for c in table[0]]
-            values = [decode_cid(str(c)).strip() if c else '' for c in table[1]]
-            header_norm = [re.sub(r'\s+', '', h) for h in header]
+            header, values = rows
+            header_norm = [_WS_RE.sub('', h) for h in header]
 
             for idx, h in enumerate(header_norm):
                 if idx >= len(values):
@@ -348,42 +433,27 @@ class AIAPDFExtractor:
                         info['annual_premium'] = max(nums)
 
                 if '保费供款年期' in h:
-                    for token in re.findall(r'\d{1,2}', cell):
-                        py = int(token)
+                    for token in _SMALL_INT_RE.finditer(cell):
+                        py = int(token.group())
                         if 2 <= py <= 30:
                             info['payment_years'] = py
                             break
 
-        # Auto-detect product from page text
-        page1_fitz_text = ''
-        try:
-            import fitz
-            doc = fitz.open(self.pdf_path)
-            page1_fitz_text = doc[0].get_text()
-            doc.close()
-        except Exception:
-            pass
-
-        for text_source in [page1_fitz_text, page1_decoded]:
-            if '环宇盈活' in text_source or '環宇盈活' in text_source:
-                info['product_name'] = '环宇盈活储蓄保险计划'
-                info['product_name_en'] = 'AIA Vision Life Savings Plan'
-            elif '活享储蓄' in text_source or '活享儲蓄' in text_source:
-                info['product_name'] = '活享储蓄保险计划'
-                info['product_name_en'] = 'AIA Flexi Savings Plan'
-            elif '爱伴航' in text_source or '愛伴航' in text_source:
-                info['product_name'] = '爱伴航保险计划'
-                info['product_name_en'] = 'AIA Love Navigator Plan'
-
-            if 'USD' in text_source or '美元' in text_source:
-                info['currency'] = 'USD'
-                info['currency_symbol'] = '$'
-            elif 'HKD' in text_source or '港元' in text_source or '港幣' in text_source:
-                info['currency'] = 'HKD'
-                info['currency_symbol'] = 'HK$'
-            elif 'RMB' in text_source or 'CNY' in text_source or '人民币' in text_source:
-                info['currency'] = 'RMB'
-                info['currency_symbol'] = '¥'
+        # Auto-detect product from page text. pdfplumber's text takes
+        # precedence; PyMuPDF's text is only read if it lacks a marker.
+        product = currency = None
+        for text_source in self._page1_text_sources(page1_decoded):
+            if product is None:
+                product = _first_marker(_PRODUCT_RE, text_source)
+            if currency is None:
+                currency = _first_marker(_CURRENCY_RE, text_source)
+            if product is not None and currency is not None:
+                break
+
+        if product is not None:
+            info['product_name'], info['product_name_en'] = _PRODUCTS[product]
+        if currency is not None:
+            info['currency'], info['currency_symbol'] = _CURRENCIES[currency]
 
         if info['annual_premium'] > 0 and info['payment_years'] > 0:
             info['total_premium'] = info['annual_premium'] * info['payment_years']
@@ -394,6 +464,22 @@ class AIAPDFExtractor:
 
         return info
 
+    def _page1_text_sources(self, page1_decoded: str):
+        """Yield page-1 text from pdfplumber, then lazily from PyMuPDF.
+
+        PyMuPDF applies the fonts' ToUnicode maps, so it can recover
+        Chinese product names that pdfplumber leaves as CID codes; the
+        second open of the PDF is skipped when it is not needed.
+        """
+        yield page1_decoded
+        try:
+            import fitz
+            with fitz.open(self.pdf_path) as doc:
+                page1_fitz_text = doc[0].get_text()
+        except Exception:
+            return
+        yield page1_fitz_text
+
     # ------------------------------------------------------------------
     # Yearly data extraction (no-withdrawal scenario)
     # ------------------------------------------------------------------
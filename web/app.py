@@ -4,18 +4,29 @@ Insurance Policy IRR Analyzer - Web Application
 Upload an AIA policy PDF to generate IRR analysis reports.
 """
 import os
-import uuid
+import gzip
+import hashlib
+import heapq
+import ipaddress
+import json
+import mimetypes
+import multiprocessing
+import secrets
 import shutil
 import tempfile
 import threading
 import time
 import functools
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import unquote
 
 from flask import (
-    Flask, render_template, request, redirect,
-    url_for, send_file, abort, session
+    Flask, Response, render_template, request, redirect,
+    url_for, send_file, abort, session, make_response
 )
+from werkzeug.exceptions import HTTPException
 
 # Add project root to path so we can import src modules
 import sys
@@ -43,36 +54,334 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated
 
-# Task storage: task_id -> {dir, excel_path, html_path, policy_info, warnings, created_at}
+
+# Upload rate limit per client address: ANALYZE_RATE_LIMIT uploads within
+# any ANALYZE_RATE_WINDOW seconds
+ANALYZE_RATE_LIMIT = 3
+ANALYZE_RATE_WINDOW = 60
+_upload_times = defaultdict(deque)
+_upload_times_lock = threading.Lock()
+_upload_times_swept_at = 0.0
+
+# Networks of the reverse proxy (comma-separated, e.g. the compose network).
+# X-Real-IP is only believed on requests coming from one of them.
+TRUSTED_PROXIES = [ipaddress.ip_network(net.strip(), strict=False)
+                   for net in os.environ.get('TRUSTED_PROXIES', '').split(',')
+                   if net.strip()]
+
+
+def _client_address():
+    """Client address of the request, as set by a trusted proxy if any."""
+    remote = request.remote_addr
+    if TRUSTED_PROXIES and remote:
+        try:
+            addr = ipaddress.ip_address(remote)
+        except ValueError:
+            return remote
+        if any(addr in net for net in TRUSTED_PROXIES):
+            return request.headers.get('X-Real-IP') or remote
+    return remote
+
+
+def rate_limited(f):
+    """Reject uploads over ANALYZE_RATE_LIMIT before the body is read."""
+    @functools.wraps(f)
+    def decorated(*args, **kwargs):
+        global _upload_times_swept_at
+        client = _client_address()
+        now = time.time()
+        cutoff = now - ANALYZE_RATE_WINDOW
+        with _upload_times_lock:
+            # Once per window, forget clients with no upload inside it
+            if _upload_times_swept_at <= cutoff:
+                stale = [key for key, times in _upload_times.items()
+                         if not times or times[-1] <= cutoff]
+                for key in stale:
+                    del _upload_times[key]
+                _upload_times_swept_at = now
+            times = _upload_times[client]
+            while times and times[0] <= cutoff:
+                times.popleft()
+            if len(times) >= ANALYZE_RATE_LIMIT:
+                limited = True
+            else:
+                times.append(now)
+                limited = False
+        if limited:
+            return render_template('error.html',
+                                   title='请求过于频繁',
+                                   message='上传过于频繁，请稍后再试。'), 429
+        return f(*args, **kwargs)
+    return decorated
+
+
+# Task storage: task_id -> {dir, future, created_at}; the future resolves to
+# the _run_pipeline result {excel_path, html_path, policy_info, warnings, ...}
+# One lock guards _tasks and _expiry_heap together: every critical section is
+# a dict get/insert/pop plus at most a heap push/pop, so it is held far too
+# briefly for request threads to contend, whatever the thread count.
 _tasks = {}
 _tasks_lock = threading.Lock()
 
-CLEANUP_AFTER_SECONDS = 3600  # 1 hour
 
+def _get_max_workers():
+    """Pipeline worker processes: one per core, capped at 4."""
+    return min(os.cpu_count() or 1, 4)
+
+
+# PDF parsing, IRR and report generation are CPU-bound, so they run in
+# worker processes instead of on the request thread. The pool is started on
+# first use inside the serving process, and its workers come from a
+# forkserver: forking the threaded gunicorn worker could copy a lock held
+# by another request thread into the child.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """The pipeline process pool, created on first call."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_get_max_workers(),
+                mp_context=multiprocessing.get_context('forkserver'))
+        return _pool
+
+
+# Task directories are deleted off the request thread
+_cleanup_pool = ThreadPoolExecutor(max_workers=1)
+
+# Pipeline results of recent uploads: blake2b of the PDF -> _run_pipeline
+# result. Re-uploading the same PDF hard-links the reports already written
+# for it, or at least skips the pdfplumber parse if they have expired.
+RESULT_CACHE_MAX_ENTRIES = 32
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+CLEANUP_AFTER_SECONDS = 3600  # 1 hour
 
+# When the app runs behind nginx with task directories on a volume shared
+# with it, report files are handed to nginx via X-Accel-Redirect instead of
+# being streamed through the worker. TASK_ROOT is that shared directory and
+# X_ACCEL_PREFIX the internal nginx location mapped onto it.
+TASK_ROOT = os.environ.get('TASK_ROOT') or None
+X_ACCEL_PREFIX = os.environ.get('X_ACCEL_PREFIX', '').rstrip('/')
+if X_ACCEL_PREFIX and not TASK_ROOT:
+    # Redirect paths are relative to TASK_ROOT; without it they would point
+    # outside the nginx location
+    raise RuntimeError('X_ACCEL_PREFIX is set but TASK_ROOT is not; '
+                       'set TASK_ROOT to the directory nginx serves under X_ACCEL_PREFIX')
+UPLOAD_COPY_CHUNK = 1024 * 1024  # 1MB
+
+# Pipeline stages, in order, as reported by /events. The worker records the
+# stage it is in to STAGE_FILE in the task directory.
+PIPELINE_STAGES = [
+    ('extract', '解析 PDF'),
+    ('irr', '计算 IRR'),
+    ('excel', '生成 Excel 报告'),
+    ('html', '生成 HTML 报告'),
+]
+STAGE_FILE = 'stage'
+EVENTS_POLL_SECONDS = 0.5
+# Each open /events stream holds a request thread while it sleeps between
+# polls. Streams end after EVENTS_MAX_SECONDS (EventSource then reconnects),
+# and at most EVENTS_MAX_STREAMS run at once so threads stay free for other
+# requests; pages beyond that fall back to reloading.
+EVENTS_MAX_SECONDS = 30
+EVENTS_MAX_STREAMS = 8
+EVENTS_RETRY_MS = 1000
+_events_slots = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+# Expiry queue of (expires_at, task_id), drained at the start of each request
+_expiry_heap = []
+
+
+@app.before_request
 def _cleanup_old_tasks():
-    """Background thread to clean up expired task files."""
-    while True:
-        time.sleep(300)  # Check every 5 minutes
-        now = time.time()
-        expired = []
-        with _tasks_lock:
-            for task_id, info in _tasks.items():
-                if now - info['created_at'] > CLEANUP_AFTER_SECONDS:
-                    expired.append(task_id)
-            for task_id in expired:
-                info = _tasks.pop(task_id)
-                shutil.rmtree(info['dir'], ignore_errors=True)
+    """Drop tasks older than CLEANUP_AFTER_SECONDS and remove their files."""
+    now = time.time()
+    head = _expiry_heap[:1]  # unlocked peek; a slice can't race another thread's pop
+    if not head or head[0][0] > now:
+        return
+    expired = []
+    with _tasks_lock:
+        while _expiry_heap and _expiry_heap[0][0] <= now:
+            _, task_id = heapq.heappop(_expiry_heap)
+            info = _tasks.pop(task_id, None)
+            if info is not None:
+                expired.append(info)
+    for info in expired:
+        info['future'].cancel()
+        _remove_task_dir(info['dir'])
+
+
+def _remove_task_dir(task_dir):
+    """Delete a task directory in the background."""
+    _cleanup_pool.submit(shutil.rmtree, task_dir, ignore_errors=True)
+
+
+def _save_upload(stream, pdf_path):
+    """Write an uploaded PDF to disk; returns its hash (the result cache key)."""
+    digest = hashlib.blake2b()
+    with open(pdf_path, 'wb') as f:
+        while chunk := stream.read(UPLOAD_COPY_CHUNK):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+
+def _cached_result(pdf_hash):
+    """Return the cached pipeline result for a PDF hash, or None."""
+    with _result_cache_lock:
+        cached = _result_cache.get(pdf_hash)
+        if cached is not None:
+            _result_cache.move_to_end(pdf_hash)
+        return cached
+
+
+def _remember_result(pdf_hash, future):
+    """Done-callback: cache the result of a successful pipeline run."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _result_cache_lock:
+        _result_cache[pdf_hash] = future.result()
+        _result_cache.move_to_end(pdf_hash)
+        while len(_result_cache) > RESULT_CACHE_MAX_ENTRIES:
+            _result_cache.popitem(last=False)
+
+
+def _link_reports(cached, task_dir):
+    """Hard-link a cached run's reports into task_dir.
+
+    Returns the cached result re-pointed at the new files, or None when
+    the earlier task's files are already gone.
+    """
+    task_result = dict(cached)
+    linked = []
+    try:
+        for key in ('excel_path', 'html_path', 'html_gz_path'):
+            path = os.path.join(task_dir, os.path.basename(cached[key]))
+            os.link(cached[key], path)
+            linked.append(path)
+            task_result[key] = path
+    except OSError:
+        # Never leave a link behind: the pipeline would write through it
+        # into the earlier task's report.
+        for path in linked:
+            os.unlink(path)
+        return None
+    return task_result
+
+
+def _gzip_report(html_path):
+    """Write a gzipped copy next to an HTML report; returns its path."""
+    gz_path = html_path + '.gz'
+    with open(html_path, 'rb') as src, gzip.open(gz_path, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst)
+    return gz_path
+
+
+def _set_stage(task_dir, stage):
+    """Record the pipeline stage a task has reached, for /events."""
+    with open(os.path.join(task_dir, STAGE_FILE), 'w') as f:
+        f.write(stage)
+
+
+def _read_stage(task_dir):
+    """Stage recorded by _set_stage; 'queued' before the worker starts."""
+    try:
+        with open(os.path.join(task_dir, STAGE_FILE)) as f:
+            return f.read() or None  # empty while being rewritten
+    except FileNotFoundError:
+        return 'queued'
+
+
+def _run_pipeline(pdf_path, task_dir, extracted=None):
+    """Extract, calculate and write both reports for one uploaded PDF.
+
+    extracted is a cached (data, warnings) pair from an earlier upload of
+    the same PDF; the PDF is only parsed when it is None.
+    """
+    # 1. Extract data from PDF
+    _set_stage(task_dir, 'extract')
+    if extracted is None:
+        # Already in a pipeline worker: parse pages in this process, not a nested pool
+        extractor = AIAPDFExtractor(pdf_path, max_workers=1)
+        extracted = (extractor.extract(), extractor.warnings)
+    data, warnings = extracted
+
+    # 2. Load and validate
+    config = load_policy_from_dict(data)
+
+    # 3. Calculate IRR
+    _set_stage(task_dir, 'irr')
+    irr_results = calculate_all_irr(config)
+
+    # 4. Generate reports
+    slug = config.policy_info.slug
+    excel_name = f'{slug}_irr_report.xlsx'
+    html_name = f'{slug}_irr_report.html'
+    excel_path = os.path.join(task_dir, excel_name)
+    html_path = os.path.join(task_dir, html_name)
+
+    _set_stage(task_dir, 'excel')
+    create_excel_report(config, irr_results, excel_path)
+    _set_stage(task_dir, 'html')
+    create_html_report(config, irr_results, html_path)
+    html_gz_path = _gzip_report(html_path)
+
+    return {
+        'excel_path': excel_path,
+        'html_path': html_path,
+        'html_gz_path': html_gz_path,
+        'excel_name': excel_name,
+        'html_name': html_name,
+        'policy_info': {
+            'product_name': config.policy_info.product_name,
+            'insured_name': config.policy_info.insured_name,
+            'currency_symbol': config.policy_info.currency_symbol,
+            'annual_premium': config.policy_info.annual_premium,
+            'payment_years': config.policy_info.payment_years,
+            'total_premium': config.policy_info.total_premium,
+        },
+        'warnings': warnings,
+        'extracted': extracted,
+    }
+
+
+def _send_task_file(path, mimetype=None, as_attachment=False, download_name=None):
+    """send_file, or an X-Accel-Redirect to nginx when X_ACCEL_PREFIX is set."""
+    if not X_ACCEL_PREFIX:
+        return send_file(path, mimetype=mimetype, as_attachment=as_attachment,
+                         download_name=download_name)
+    response = app.response_class(
+        mimetype=mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream')
+    rel_path = os.path.relpath(path, TASK_ROOT).replace(os.sep, '/')
+    response.headers['X-Accel-Redirect'] = f'{X_ACCEL_PREFIX}/{rel_path}'
+    if as_attachment:
+        response.headers.set('Content-Disposition', 'attachment',
+                             filename=download_name or os.path.basename(path))
+    return response
+
+
+def _finished_result(task_id):
+    """Pipeline result of a successfully finished task, or 404."""
+    with _tasks_lock:
+        task = _tasks.get(task_id)
+    if not task or not task['future'].done() or task['future'].exception() is not None:
+        abort(404)
+    return task['future'].result()
 
 
-# Start cleanup thread
-_cleanup_thread = threading.Thread(target=_cleanup_old_tasks, daemon=True)
-_cleanup_thread.start()
+# Probed every few seconds; the body is serialized once, not per request
+_HEALTH_RESPONSE = (b'{"status":"ok"}', 200, {'Content-Type': 'application/json'})
 
 
 @app.route('/health')
 def health():
-    return {'status': 'ok'}, 200
+    return _HEALTH_RESPONSE
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -95,6 +404,7 @@ def index():
 
 @app.route('/analyze', methods=['POST'])
 @login_required
+@rate_limited
 def analyze():
     if 'pdf_file' not in request.files:
         return render_template('error.html',
@@ -107,67 +417,83 @@ def analyze():
                                title='未选择文件',
                                message='请选择一个 PDF 文件上传。'), 400
 
-    if not file.filename.lower().endswith('.pdf'):
+    return _start_task(file.filename, file.stream)
+
+
+@app.route('/analyze_stream', methods=['POST'])
+@login_required
+@rate_limited
+def analyze_stream():
+    """Upload the PDF as the raw request body, bypassing the multipart parser.
+
+    The file name is sent URL-encoded in the X-Filename header.
+    """
+    filename = unquote(request.headers.get('X-Filename', ''))
+    if not filename:
+        return render_template('error.html',
+                               title='未选择文件',
+                               message='请选择一个 PDF 文件上传。'), 400
+    if request.content_length is None:
+        abort(411)
+    if request.content_length > app.config['MAX_CONTENT_LENGTH']:
+        abort(413)
+
+    response = make_response(_start_task(filename, request.stream))
+    if response.status_code == 302:
+        # Scripted upload: answer 202 with the result URL instead of a redirect
+        response = Response(status=202, headers={'Location': response.location})
+    return response
+
+
+def _start_task(filename, stream):
+    """Save an uploaded PDF stream and submit its analysis."""
+    if not filename.lower().endswith('.pdf'):
         return render_template('error.html',
                                title='文件格式错误',
                                message='仅支持 PDF 文件。请上传 AIA 保单计划书 PDF。'), 400
 
     # Create task directory
-    task_id = uuid.uuid4().hex[:12]
-    task_dir = tempfile.mkdtemp(prefix=f'irr-{task_id}-')
+    task_id = secrets.token_urlsafe(9)
+    task_dir = tempfile.mkdtemp(prefix=f'irr-{task_id}-', dir=TASK_ROOT)
+    if X_ACCEL_PREFIX:
+        os.chmod(task_dir, 0o755)  # nginx reads the reports directly
 
     try:
         # Save uploaded PDF
         pdf_path = os.path.join(task_dir, 'upload.pdf')
-        file.save(pdf_path)
-
-        # 1. Extract data from PDF
-        extractor = AIAPDFExtractor(pdf_path)
-        data = extractor.extract()
-        warnings = extractor.warnings
-
-        # 2. Load and validate
-        config = load_policy_from_dict(data)
-
-        # 3. Calculate IRR
-        irr_results = calculate_all_irr(config)
-
-        # 4. Generate reports
-        slug = config.policy_info.insurer.lower().replace(' ', '_')
-        excel_path = os.path.join(task_dir, f'{slug}_irr_report.xlsx')
-        html_path = os.path.join(task_dir, f'{slug}_irr_report.html')
-
-        create_excel_report(config, irr_results, excel_path)
-        create_html_report(config, irr_results, html_path)
-
-        # Store task info
-        with _tasks_lock:
-            _tasks[task_id] = {
-                'dir': task_dir,
-                'excel_path': excel_path,
-                'html_path': html_path,
-                'excel_name': f'{slug}_irr_report.xlsx',
-                'html_name': f'{slug}_irr_report.html',
-                'policy_info': {
-                    'product_name': config.policy_info.product_name,
-                    'insured_name': config.policy_info.insured_name,
-                    'currency_symbol': config.policy_info.currency_symbol,
-                    'annual_premium': config.policy_info.annual_premium,
-                    'payment_years': config.policy_info.payment_years,
-                    'total_premium': config.policy_info.total_premium,
-                },
-                'warnings': warnings,
-                'created_at': time.time(),
-            }
-
-        return redirect(url_for('result', task_id=task_id))
-
+        pdf_hash = _save_upload(stream, pdf_path)
+        cached = _cached_result(pdf_hash)
+        task_result = _link_reports(cached, task_dir) if cached else None
+        if task_result is not None:
+            future = Future()
+            future.set_result(task_result)
+        else:
+            future = _get_pool().submit(_run_pipeline, pdf_path, task_dir,
+                                        cached['extracted'] if cached else None)
+        future.add_done_callback(functools.partial(_remember_result, pdf_hash))
+    except HTTPException:
+        # Oversized or aborted upload body: keep its 4xx status
+        _remove_task_dir(task_dir)
+        raise
     except Exception as e:
-        shutil.rmtree(task_dir, ignore_errors=True)
+        _remove_task_dir(task_dir)
         return render_template('error.html',
                                title='分析失败',
                                message=f'PDF 解析或 IRR 计算过程中出错：{str(e)}'), 500
 
+    created_at = time.time()
+    info = {
+        'dir': task_dir,
+        'future': future,
+        'created_at': created_at,
+    }
+    expiry = (created_at + CLEANUP_AFTER_SECONDS, task_id)
+    with _tasks_lock:
+        _tasks[task_id] = info
+        heapq.heappush(_expiry_heap, expiry)
+
+    return redirect(url_for('result', task_id=task_id))
+
 
 @app.route('/result/<task_id>')
 @login_required
@@ -179,42 +505,98 @@ def result(task_id):
                                title='任务不存在',
                                message='该分析结果已过期或不存在，请重新上传 PDF。'), 404
 
+    future = task['future']
+    if not future.done():
+        return render_template('processing.html', task_id=task_id,
+                               stages=PIPELINE_STAGES), 202
+
+    error = future.exception()
+    if error is not None:
+        with _tasks_lock:
+            _tasks.pop(task_id, None)
+        _remove_task_dir(task['dir'])
+        return render_template('error.html',
+                               title='分析失败',
+                               message=f'PDF 解析或 IRR 计算过程中出错：{str(error)}'), 500
+
+    task_result = future.result()
     return render_template('result.html',
                            task_id=task_id,
-                           policy_info=task['policy_info'],
-                           warnings=task['warnings'])
+                           policy_info=task_result['policy_info'],
+                           warnings=task_result['warnings'])
 
 
-@app.route('/report/<task_id>')
+@app.route('/events/<task_id>')
 @login_required
-def report(task_id):
+def events(task_id):
+    """Server-sent events with a task's pipeline stage.
+
+    The stream ends when the task finishes, or after EVENTS_MAX_SECONDS
+    for the client to reconnect.
+    """
     with _tasks_lock:
         task = _tasks.get(task_id)
     if not task:
         abort(404)
-    return send_file(task['html_path'], mimetype='text/html')
+    if not _events_slots.acquire(blocking=False):
+        abort(503)
+
+    def stream():
+        future = task['future']
+        stage = None
+        deadline = time.monotonic() + EVENTS_MAX_SECONDS
+        yield f'retry: {EVENTS_RETRY_MS}\n\n'
+        while not future.done():
+            if time.monotonic() >= deadline:
+                return
+            current = _read_stage(task['dir']) or stage
+            if current != stage:
+                stage = current
+                yield f'data: {json.dumps({"stage": stage})}\n\n'
+            time.sleep(EVENTS_POLL_SECONDS)
+        final = 'error' if future.exception() is not None else 'done'
+        yield f'data: {json.dumps({"stage": final})}\n\n'
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.call_on_close(_events_slots.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # don't let nginx buffer events
+    return response
+
+
+@app.route('/report/<task_id>')
+@login_required
+def report(task_id):
+    task_result = _finished_result(task_id)
+    # Under X-Accel-Redirect nginx picks the .gz itself (gzip_static)
+    if X_ACCEL_PREFIX:
+        return _send_task_file(task_result['html_path'], mimetype='text/html')
+    if 'gzip' in request.accept_encodings:
+        # No ETag or Range handling: both would describe the gzip bytes
+        response = send_file(task_result['html_gz_path'], mimetype='text/html',
+                             download_name=task_result['html_name'],
+                             conditional=False, etag=False)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_file(task_result['html_path'], mimetype='text/html')
+    response.vary.add('Accept-Encoding')
+    return response
 
 
 @app.route('/download/<task_id>/excel')
 @login_required
 def download_excel(task_id):
-    with _tasks_lock:
-        task = _tasks.get(task_id)
-    if not task:
-        abort(404)
-    return send_file(task['excel_path'], as_attachment=True,
-                     download_name=task['excel_name'])
+    task_result = _finished_result(task_id)
+    return _send_task_file(task_result['excel_path'], as_attachment=True,
+                           download_name=task_result['excel_name'])
 
 
 @app.route('/download/<task_id>/html')
 @login_required
 def download_html(task_id):
-    with _tasks_lock:
-        task = _tasks.get(task_id)
-    if not task:
-        abort(404)
-    return send_file(task['html_path'], as_attachment=True,
-                     download_name=task['html_name'])
+    task_result = _finished_result(task_id)
+    return _send_task_file(task_result['html_path'], as_attachment=True,
+                           download_name=task_result['html_name'])
 
 
 if __name__ == '__main__':